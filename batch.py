@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+# Command line entry point of pam4/batch.py (same as python -m pam4.batch).
+from pam4.batch import cli
+
+if __name__ == "__main__":
+    cli()
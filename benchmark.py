@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+# Command line entry point of pam4/benchmark.py (same as python -m pam4.benchmark).
+from pam4.benchmark import cli
+
+if __name__ == "__main__":
+    cli()
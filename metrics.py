@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+# Command line entry point of pam4/metrics.py (same as python -m pam4.metrics).
+from pam4.metrics import cli
+
+if __name__ == "__main__":
+    cli()
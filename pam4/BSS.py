@@ -0,0 +1,245 @@
+import numpy as np
+
+from . import audio
+
+def writeAudio(name, y, sr_hz):
+    """ Write y to a 16 bits .wav file, normalized to full scale (streamed by audio.WavWriter). """
+    audio.write(name, y, sr_hz, normalize=True)
+"""
+x0, sr_hz = audio.read('results/overNMF/0_EstimatedSource.wav')
+x1, sr_hz = audio.read('results/overNMF/1_EstimatedSource.wav')
+x2, sr_hz = audio.read('results/overNMF/2_EstimatedSource.wav')
+#x3, sr_hz = audio.read('results/overNMF/3_EstimatedSource.wav')
+x4, sr_hz = audio.read('results/overNMF/4_EstimatedSource.wav')
+x5, sr_hz = audio.read('results/overNMF/5_EstimatedSource.wav')
+x6, sr_hz = audio.read('results/overNMF/6_EstimatedSource.wav')
+x7, sr_hz = audio.read('results/overNMF/7_EstimatedSource.wav')
+
+writeAudio("results/overNMF/overNMF_EstimatedSource_4_5_6.wav", x4 + x5 + x6, sr_hz)
+"""
+def whitening_matrix(Sigma, method='zca'):
+    """
+    Whitening matrix W of data with covariance Sigma, so that the whitened
+    data is (X - mean) W^T.
+    Inputs:
+        Sigma:  Covariance matrix of the data.
+        method: Whitening method. Must be one of 'zca', 'zca_cor', 'pca',
+                'pca_cor', or 'cholesky'.
+    """
+    W = None
+    
+    if method in ['zca', 'pca', 'cholesky']:
+        U, Lambda, _ = np.linalg.svd(Sigma)
+        if method == 'zca':
+            W = np.dot(U, np.dot(np.diag(1.0 / np.sqrt(Lambda + 1e-5)), U.T))
+        elif method =='pca':
+            W = np.dot(np.diag(1.0 / np.sqrt(Lambda + 1e-5)), U.T)
+        elif method == 'cholesky':
+            W = np.linalg.cholesky(np.dot(U, np.dot(np.diag(1.0 / (Lambda + 1e-5)), U.T))).T
+    elif method in ['zca_cor', 'pca_cor']:
+        V_sqrt = np.diag(np.sqrt(np.diag(Sigma)))
+        P = np.dot(np.dot(np.linalg.inv(V_sqrt), Sigma), np.linalg.inv(V_sqrt))
+        G, Theta, _ = np.linalg.svd(P)
+        if method == 'zca_cor':
+            W = np.dot(np.dot(G, np.dot(np.diag(1.0 / np.sqrt(Theta + 1e-5)), G.T)), np.linalg.inv(V_sqrt))
+        elif method == 'pca_cor':
+            W = np.dot(np.dot(np.diag(1.0/np.sqrt(Theta + 1e-5)), G.T), np.linalg.inv(V_sqrt))
+    else:
+        raise Exception('Whitening method not found.')
+
+    return W
+
+def whiten(X, method='zca', dtype=np.float64):
+    """
+    from https://gist.github.com/joelouismarino/ce239b5601fff2698895f48003f7464b
+    Whitens the input matrix X using specified whitening method.
+    Inputs:
+        X:      Input data matrix with data examples along the first dimension
+        method: Whitening method. Must be one of 'zca', 'zca_cor', 'pca',
+                'pca_cor', or 'cholesky'.
+        dtype:  Precision of the whitened data (np.float32 halves its memory).
+                The small covariance matrix is decomposed in float64.
+    """
+    X = np.asarray(X, dtype=dtype)
+    X = X.reshape((-1, np.prod(X.shape[1:])))
+    X_centered = X - np.mean(X, axis=0)
+    Sigma = np.dot(X_centered.T, X_centered) / X_centered.shape[0]
+    W = whitening_matrix(Sigma.astype(float), method).astype(dtype)
+
+    return np.dot(X_centered, W.T)
+
+def covariance_chunked(X, chunk_size=2**16, dtype=np.float64):
+    """
+    Mean and covariance of X, accumulated chunk by chunk (pairwise update
+    of Chan et al.), so that only one chunk is converted to float at a time.
+    Inputs:
+        X:          (T, n) array-like with data examples along the first
+                    dimension, e.g. a np.memmap of a WAV file.
+        chunk_size: Number of examples per chunk.
+        dtype:      Precision of the chunks, the (n, n) accumulators being
+                    kept in float64.
+    """
+    T, n = X.shape
+    count = 0
+    mean = np.zeros(n)
+    M2 = np.zeros((n, n))
+    for start in range(0, T, chunk_size):
+        # A copy: X may be a float array (or a writable memmap) of dtype
+        chunk = np.array(X[start:start + chunk_size], dtype=dtype)
+        m = len(chunk)
+        chunk_mean = chunk.mean(axis=0)
+        chunk -= chunk_mean
+        delta = chunk_mean - mean
+        M2 += np.dot(chunk.T, chunk) + np.outer(delta, delta) * count * m / (count + m)
+        mean += delta * m / (count + m)
+        count += m
+    return mean, M2 / count
+
+def whiten_chunked(X, method='zca', chunk_size=2**16, out=None, dtype=np.float64):
+    """
+    Two-pass whitening within a fixed memory budget: the first pass
+    accumulates the mean and covariance of X, the second one applies the
+    whitening transform chunk by chunk. Same result as whiten.
+    Inputs:
+        X:          (T, n) array-like with data examples along the first
+                    dimension, e.g. a np.memmap of a WAV file.
+        method:     Whitening method, as in whiten.
+        chunk_size: Number of examples per chunk.
+        out:        (T, n) output buffer, e.g. a np.memmap. Allocated in
+                    memory if not given.
+        dtype:      Precision of the chunks and of the allocated output.
+    """
+    mean, Sigma = covariance_chunked(X, chunk_size, dtype)
+    W = whitening_matrix(Sigma, method).astype(dtype)
+    mean = mean.astype(dtype)
+
+    if out is None:
+        out = np.empty(X.shape, dtype=dtype)
+    for start in range(0, len(X), chunk_size):
+        chunk = np.asarray(X[start:start + chunk_size], dtype=dtype)
+        out[start:start + chunk_size] = np.dot(chunk - mean, W.T)
+    return out
+
+def repatialize(x, angle, sr_hz, name="audios/mix2.wav"):
+    A = np.array([angle, 1 - angle, angle, 1 - angle]).reshape((2,2))
+    s_hat = (A@x.T).T
+    writeAudio(name, s_hat, sr_hz)
+    return s_hat
+
+#%% Cardoso ver.
+def phi(s, k):
+    """Edgeworth approximation"""
+    return s - k * (np.power(s,3) - 3 * s) / 6
+
+def phi_o(s, k):
+    return -k * np.power(s,3)
+
+def H_phi(y, k):
+    """Estimation function at one sample y (n,), without whitening"""
+    H = np.outer(phi(y, k), y) - np.identity(len(y))
+    return H
+
+def H_phi_o(y, k):
+    H_o = np.outer(y, y) - np.identity(len(y)) + np.outer(phi_o(y,k), y) - np.outer(y, phi_o(y,k))
+    return H_o
+
+def estimation_eq(y, k):
+    """
+    Empirical mean of H_phi over all samples, as a single matrix product.
+    Args:
+        - y (T, n): estimated sources.
+        - k (n,): kurtosis of each source.
+    """
+    T, n = y.shape
+    return np.dot(phi(y, k).T, y) / T - np.identity(n, dtype=y.dtype)
+
+def relative_gradient_descend(x, epsilon=1e-3, learning_rate=0.2, max_iter=200, tol=1e-6, patience=10,
+                              dtype=np.float64):
+    """
+    Off-line implementation, for any number of channels.
+    The relative gradient step uses the off-diagonal part of the estimation
+    equation, the diagonal (the scale of the sources) being fixed by
+    normalizing the sources to unit variance after each step: with the
+    Edgeworth score, the full update rescales y at each step and diverges.
+    The criterion often increases during the first steps, so that descent stops
+    only when it has not improved for patience iterations, the best
+    iterate being returned.
+    Args:
+        - x (T, n): mixtures.
+        - epsilon (float): stop when the Frobenius norm of the off-diagonal
+          part of the estimation equation (the independence condition)
+          falls below epsilon.
+        - learning_rate (float): relative gradient step.
+        - max_iter (int): maximum number of iterations.
+        - tol (float): minimum relative decrease of this norm below its
+          best value for an iteration to count as an improvement.
+        - patience (int): stop after this number of iterations without
+          improvement.
+        - dtype (dtype): precision of the whitened data and of the updates.
+    Returns:
+        - y (T, n): estimated sources, with unit variance, at the best iteration.
+        - B (n, n): separation matrix, applied to the whitened mixtures.
+        - loss (list of float): norm of the off-diagonal part of the
+          estimation equation at each iteration.
+    """
+    from scipy.stats import kurtosis
+
+    def off_diagonal(y):
+        H_hat = estimation_eq(y, kurtosis(y).astype(dtype))
+        return H_hat - np.diag(np.diag(H_hat))
+
+    # whitening, to exactly unit variance (whiten regularizes the covariance)
+    y = whiten(x, dtype=dtype)
+    scale = y.std(axis=0)
+    y /= scale
+    B = np.diag(1 / scale).astype(dtype)
+
+    loss = []
+    best, since = None, 0
+    for it in range(max_iter):
+        H_hat = off_diagonal(y)
+        loss.append(float(np.linalg.norm(H_hat)))
+        if not np.isfinite(loss[-1]):
+            break
+        if best is None or loss[-1] < (1 - tol) * loss[best[0]]:
+            best, since = (it, y, B), 0
+        else:
+            since += 1
+        if loss[-1] < epsilon or since >= patience:
+            break
+
+        # relative gradient update y <- (I - lambda H) y, then unit variance
+        G = np.identity(len(B), dtype=dtype) - learning_rate * H_hat
+        y, B = np.dot(y, G.T), np.dot(G, B)
+        scale = y.std(axis=0)
+        y /= scale
+        B /= scale[:, None]
+
+    it, y, B = best
+    return y, B, loss
+
+#%% main call
+def cli():
+    """ Command line entry point: python BSS.py, or python -m pam4.BSS. """
+    import matplotlib.pyplot as plt
+
+    x, sr_hz = audio.read('audios/Prise_2.wav')
+
+    T = sr_hz * 4
+    x = x[:T]
+    plt.plot(x)
+    plt.show()
+
+    s_hat, B, loss = relative_gradient_descend(x)
+    print(B)
+    plt.plot(loss)
+    plt.show()
+
+    writeAudio("temp/originalL.wav", x[:,0], sr_hz)
+    writeAudio("temp/originalR.wav", x[:,1], sr_hz)
+    writeAudio("results/source1.wav", s_hat[:,0], sr_hz)
+    writeAudio("results/source2.wav", s_hat[:,1], sr_hz)
+    writeAudio("temp/mono.wav", np.sum(s_hat, axis=1), sr_hz)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,438 @@
+import os
+import json
+from collections.abc import Mapping
+import numpy as np
+import xml.etree.ElementTree as ET
+
+filename = 'temp/sources.xml'
+
+ex_params = ['Wex', 'Uex', 'Gex', 'Hex']
+ft_params = ['Wft', 'Uft', 'Gft', 'Hft']
+
+def readData(node, size, dtype=float):
+    """
+    Parse the whitespace separated numbers of a data node directly into an
+    array, without intermediate Python floats.
+    Args:
+        - node (Element): node whose 'data' child holds the numbers.
+        - size (int): expected number of entries.
+        - dtype (dtype): precision of the array, float64 or float32.
+    """
+    data = np.fromstring(node.findtext('data'), dtype=dtype, sep=' ')
+    if data.size != size:
+        raise ValueError('%s: expected %d entries, got %d' % (node.tag, size, data.size))
+    return data
+
+def castData(data, dtype):
+    """ data in the precision of dtype, complex data staying complex. Not copied if it already is. """
+    target = np.result_type(dtype, 1j) if np.iscomplexobj(data) else np.dtype(dtype)
+    return data if data.dtype == target else data.astype(target)
+
+def readEye(node, dtype=float):
+    mat = {}
+    rows = int(node.findtext('rows'))
+    cols = int(node.findtext('cols'))
+    mat['data'] = np.eye(rows, cols, dtype=dtype)
+    return mat
+
+
+def readMixingParameter(node, dtype=float):
+    A = {}
+    for k in node.keys():
+        A[k] = node.get(k)
+    A['mixingType'] = A['mixing_type']
+    del A['mixing_type']
+
+    dim = [];
+    for e in node.findall('dim'):
+        dim.append(int(e.text))
+
+    if node.find('type').text == 'real':
+        A['data'] = np.reshape(readData(node, np.prod(dim), dtype), dim, order='F')
+    else:
+        buf = readData(node, 2 * np.prod(dim), dtype)
+        A['data'] = np.zeros(dim, dtype=np.result_type(dtype, 1j))
+        s = dim[0] * dim[1]
+        d = [dim[0], dim[1]]
+        for i in range(dim[-1]):
+            inf = 2*s*i
+            sup = s*(2*(i+1)-1)
+            real_part = np.reshape(buf[inf:sup], d, order='F')
+
+            inf = s*(2*(i+1)-1)
+            sup = 2*s*(i+1)
+            imag_part = np.reshape(buf[inf:sup], d, order='F')
+            A['data'][:,:,i] = real_part + imag_part*1j
+    return A
+
+def readNonNegMatrix(node, dtype=float):
+    mat = {}
+    for k in node.keys():
+        mat[k] = node.get(k)
+    rows = int(node.findtext('rows'))
+    cols = int(node.findtext('cols'))
+
+    mat['data'] = readData(node, rows * cols, dtype).reshape(rows, cols, order='F')
+    return mat
+
+def readWiener(node):
+    """ Wiener filter parameters (a, b, c1, c2, d) of a source. """
+    return {child.tag: float(child.text) for child in node}
+
+def readParam(key, node, dtype=float):
+    """ Decode the node of a source parameter (A, or excitation/filter matrix) in the precision of dtype. """
+    if key == 'A':
+        return readMixingParameter(node, dtype)
+    if node.findtext('data').strip() == 'eye':
+        return readEye(node, dtype)
+    return readNonNegMatrix(node, dtype)
+
+class LazySource(Mapping):
+    """
+    Source read from an XML file, whose parameters are decoded from their
+    XML node only when accessed (and then cached, the node being released).
+    Args:
+        - node (Element): source node.
+        - params (list of str): parameters to keep, default to all.
+        - dtype (dtype): precision of the decoded matrices.
+    """
+    def __init__(self, node, params=None, dtype=float):
+        self._dtype = dtype
+        self._values = {}
+        self._nodes = {}
+        if node.get('name') is not None:
+            self._values['name'] = node.get('name')
+        if node.find('wiener') is not None:
+            self._values['wiener'] = readWiener(node.find('wiener'))
+
+        keys = ['A'] + ex_params
+        if node.find('Wft') is not None:
+            keys += ft_params
+        for key in keys:
+            if params is None or key in params:
+                self._nodes[key] = node.find(key)
+
+    def __getitem__(self, key):
+        if key in self._nodes:
+            self._values[key] = readParam(key, self._nodes.pop(key), self._dtype)
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(list(self._values) + list(self._nodes))
+
+    def __len__(self):
+        return len(self._values) + len(self._nodes)
+
+def paramShape(source, key):
+    """
+    Shape of the data of a source parameter, read from the dim or rows/cols
+    nodes when the parameter of a LazySource is not decoded yet.
+    """
+    node = source._nodes.get(key) if isinstance(source, LazySource) else None
+    if node is None:
+        return np.shape(source[key]['data'])
+    if key == 'A':
+        return tuple(int(e.text) for e in node.findall('dim'))
+    return int(node.findtext('rows')), int(node.findtext('cols'))
+
+def readSource(node):
+    return dict(LazySource(node))
+
+def iterXML(fname, params=None, dtype=float):
+    """
+    Stream the content of an XML file with iterparse, parsed elements being
+    cleared as soon as each source is complete.
+    Args:
+        - fname (str): path to the .xml file.
+        - params (list of str): source parameters to keep, default to all.
+        - dtype (dtype): precision of the decoded matrices.
+    Yields:
+        - ('wlen', int), then ('source', LazySource) for each source.
+    """
+    root = None
+    for event, elem in ET.iterparse(fname, events=('start', 'end')):
+        if root is None:
+            root = elem
+        elif event == 'end' and elem.tag == 'wlen':
+            yield 'wlen', int(elem.text)
+        elif event == 'end' and elem.tag == 'source':
+            source = LazySource(elem, params, dtype)
+            root.clear()
+            yield 'source', source
+
+def iterSources(fname, params=None, sidecar=True, mmap_mode='r', dtype=float):
+    """
+    Iterate over the sources of an XML file one at a time, each parameter
+    being decoded only when accessed, e.g. to inspect the Wex of one source
+    without loading the Hex of all the sources.
+    Args:
+        - fname (str): path to the .xml file.
+        - params (list of str): source parameters to keep, default to all.
+        - sidecar (bool): read the binary sidecar of the file when it is up to date.
+        - mmap_mode (str): memory-map mode of the sidecar matrices.
+        - dtype (dtype): precision of the matrices.
+    """
+    data = loadSidecar(fname, mmap_mode, dtype) if sidecar else None
+    if data is not None:
+        for source in data['sources']:
+            yield {k: v for k, v in source.items() if params is None or k == 'name' or k in params}
+        return
+
+    for kind, value in iterXML(fname, params, dtype):
+        if kind == 'source':
+            yield value
+
+def sidecarPath(fname):
+    """ Directory of the binary sidecar of an XML file. """
+    return fname + '.sidecar'
+
+def xmlStamp(fname):
+    """ Size and modification time identifying a version of the XML file. """
+    stat = os.stat(fname)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def writeSidecar(fname, data):
+    """
+    Write the binary sidecar of an XML file: one .npy file per matrix, and an
+    index.json with the other fields and the precision of the matrices.
+    Args:
+        - fname (str): path to the .xml file.
+        - data (dict): content of the XML file, as returned by loadXML.
+    """
+    path = sidecarPath(fname)
+    os.makedirs(path, exist_ok=True)
+
+    index = {'stamp': xmlStamp(fname), 'wlen': data['wlen'], 'dtype': 'float64', 'sources': []}
+    for j, source in enumerate(data['sources']):
+        entry = {}
+        for key, param in source.items():
+            if not isinstance(param, dict) or 'data' not in param:
+                entry[key] = param
+                continue
+            entry[key] = {k: v for k, v in param.items() if k != 'data'}
+            if 'adaptability' not in param and param['data'].ndim == 2 and \
+                    np.array_equal(param['data'], np.eye(*param['data'].shape)):
+                entry[key]['eye'] = list(param['data'].shape)
+            else:
+                entry[key]['file'] = '%d_%s.npy' % (j, key)
+                np.save(os.path.join(path, entry[key]['file']), param['data'])
+                if np.finfo(param['data'].dtype).bits < 64:
+                    index['dtype'] = 'float32'
+        index['sources'].append(entry)
+
+    # The index is written last, so that an interrupted write is never valid
+    with open(os.path.join(path, 'index.json'), 'w') as f:
+        json.dump(index, f)
+
+def loadSidecar(fname, mmap_mode='r', dtype=float):
+    """
+    Load the binary sidecar of an XML file, if it is up to date and at least
+    as precise as dtype.
+    Args:
+        - fname (str): path to the .xml file.
+        - mmap_mode (str): memory-map mode of the matrices, None to load them.
+          Matrices stored in another precision than dtype are loaded and cast.
+        - dtype (dtype): precision of the matrices.
+    Returns:
+        - data (dict): same content as loadXML, None without a valid sidecar.
+    """
+    path = sidecarPath(fname)
+    try:
+        with open(os.path.join(path, 'index.json')) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index['stamp'] != xmlStamp(fname):
+        return None
+    if np.dtype(index.get('dtype', 'float64')).itemsize < np.dtype(dtype).itemsize:
+        return None
+
+    data = {'wlen': index['wlen'], 'sources': []}
+    for entry in index['sources']:
+        source = {}
+        for key, param in entry.items():
+            if not isinstance(param, dict) or ('file' not in param and 'eye' not in param):
+                source[key] = param
+                continue
+            source[key] = {k: v for k, v in param.items() if k not in ['file', 'eye']}
+            if 'eye' in param:
+                source[key]['data'] = np.eye(*param['eye'], dtype=dtype)
+            else:
+                source[key]['data'] = castData(np.load(os.path.join(path, param['file']), mmap_mode=mmap_mode), dtype)
+        data['sources'].append(source)
+    return data
+
+def loadXML(fname, sidecar=True, mmap_mode='r', dtype=float):
+    """
+    Load the sources of a FASST XML file.
+    Args:
+        - fname (str): path to the .xml file.
+        - sidecar (bool): load the matrices from the binary sidecar of the file
+          when it is up to date, and write it after parsing the XML otherwise.
+        - mmap_mode (str): memory-map mode of the sidecar matrices.
+        - dtype (dtype): precision of the matrices, e.g. np.float32 to halve
+          their memory. A float32 sidecar is rewritten by a float64 load.
+    """
+    if sidecar:
+        data = loadSidecar(fname, mmap_mode, dtype)
+        if data is not None:
+            return data
+
+    data = {'sources': []}
+    for kind, value in iterXML(fname, dtype=dtype):
+        if kind == 'wlen':
+            # retrieve Window length
+            data['wlen'] = value
+        else:
+            # retrieve all sources
+            data['sources'].append(dict(value))
+
+    if sidecar:
+        try:
+            writeSidecar(fname, data)
+        except OSError as e:
+            print('Could not write the sidecar of %s: %s' % (fname, e))
+    return data
+
+def pooling(n, size):
+    """ (size, n) matrix averaging n rows (or columns) into at most size blocks. """
+    size = max(1, min(n, size))
+    block = np.arange(n) * size // n
+    M = np.zeros((size, n))
+    M[block, np.arange(n)] = 1
+    return M / M.sum(axis=1, keepdims=True)
+
+def decimated_params(source, params, resolution=512):
+    """
+    Views of the parameters of a source and of their products E = W U,
+    P = G H and V = E P at display resolution: the outer factors are averaged
+    over blocks of rows (W, G) and columns (U, H) before the products, which
+    are computed in the cheapest order (engine.chain), so that the views are
+    the exact block means of the full products, never materialized.
+    Args:
+        - source (dict): source with the params matrices (missing ones are identity).
+        - params (list of str): names of W, U, G and H (ex_params or ft_params).
+        - resolution (int): maximum number of rows and columns of the views.
+    Returns:
+        - views (dict): 'W', 'U', 'G', 'H', 'E', 'P', 'V' arrays (None for the
+          missing parameters).
+    """
+    from . import engine
+    W, U, G, H = [source[p]['data'] if p in source else None for p in params]
+
+    def pooled(*mats):
+        # Block means of the product of mats, None if they are all missing
+        mats = [m for m in mats if m is not None]
+        if not mats:
+            return None
+        rows, cols = mats[0].shape[0], mats[-1].shape[1]
+        view = engine.chain([pooling(rows, resolution)] + mats + [pooling(cols, resolution).T])
+        return np.asarray(view)
+
+    return {'W': pooled(W), 'U': pooled(U), 'G': pooled(G), 'H': pooled(H),
+            'E': pooled(W, U), 'P': pooled(G, H), 'V': pooled(W, U, G, H)}
+
+def draw_params(fig, views, title, ex_ft):
+    """ Draw the views of decimated_params on a 4x4 grid of fig, as plot_params. """
+    fig.suptitle(title + ex_ft)
+    axes = fig.subplots(4, 4)
+    positions = {'H': (0, 3), 'G': (1, 2), 'P': (1, 3), 'U': (2, 1), 'W': (3, 0), 'E': (3, 1), 'V': (3, 3)}
+    for key, (row, col) in positions.items():
+        if views[key] is not None:
+            axes[row, col].imshow(views[key], origin='lower', aspect='auto')
+        axes[row, col].set_title(key + '_' + ex_ft)
+    return axes
+
+def plot_params(source, params, ex_ft, resolution=512):
+    """
+    Plot the parameters of a source and their products, at most resolution
+    rows and columns each (see decimated_params).
+    """
+    import matplotlib.pyplot as plt
+    views = decimated_params(source, params, resolution)
+
+    fig = plt.figure(figsize=(20,20))
+    draw_params(fig, views, source['name'], ex_ft)
+
+    plt.show()
+    
+    
+    return fig
+
+def render_params(fname, index, params, ex_ft, png, resolution=256, dpi=50):
+    """
+    Worker: write the thumbnail of the parameters of the index-th source of
+    an XML file to png, with the Agg canvas (no display, no pyplot state).
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    source = loadXML(fname)['sources'][index]
+    views = decimated_params(source, params, resolution)
+    fig = Figure(figsize=(20, 20))
+    FigureCanvasAgg(fig)
+    draw_params(fig, views, source['name'], ex_ft)
+    fig.savefig(png, dpi=dpi)
+    return png
+
+def report(fname, output_dir, params=ex_params, ex_ft='_ex', resolution=256, dpi=50, processes=None):
+    """
+    Headless report: PNG thumbnails of the parameters of all the sources of
+    an XML file, rendered in parallel.
+    The file is loaded once first, so that the workers memory-map its sidecar.
+    Args:
+        - fname (str): path to the .xml file.
+        - output_dir (str): directory of the <source name><ex_ft>.png files.
+        - params (list of str): ex_params or ft_params.
+        - resolution (int): maximum number of rows and columns of the images.
+        - dpi (int): resolution of the PNG files.
+        - processes (int): number of worker processes, default to the number of cores.
+    Returns:
+        - pngs (list of str): paths of the PNG files.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    sources = loadXML(fname)['sources']
+    os.makedirs(output_dir, exist_ok=True)
+    pngs = [os.path.join(output_dir, '%s%s.png' % (source['name'], ex_ft)) for source in sources]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(render_params, fname, j, params, ex_ft, png, resolution, dpi)
+                   for j, png in enumerate(pngs)]
+        return [future.result() for future in futures]
+
+#%% main call
+def cli():
+    """ Command line entry point: python XMLReader.py, or python -m pam4.XMLReader. """
+    import argparse
+    import matplotlib.pyplot as plt
+    parser = argparse.ArgumentParser(description='Plot the estimated source parameters of a FASST XML file.')
+
+    parser.add_argument('filename', nargs='?', default=filename,
+                        type=str, help='FASST XML file.')
+
+    parser.add_argument('-report', default=None,
+                        type=str, help='Write PNG thumbnails of all the sources to this directory instead of showing them.', dest='report')
+
+    parser.add_argument('-res', '--resolution', default=256,
+                        type=int, help='Maximum number of rows and columns of the images.', dest='resolution')
+
+    options = parser.parse_args()
+
+    if options.report is not None:
+        for png in report(options.filename, options.report, resolution=options.resolution):
+            print(png)
+    else:
+        for source in iterSources(options.filename):
+            name = source['name']
+            A = source['A']['data']
+
+            plt.imshow(np.log(source['Wex']['data']))
+            plt.plot()
+            plt.imshow(source['Hex']['data'])
+            plt.show()
+
+            plot_params(source, ex_params, '_ex', options.resolution)
+            #plot_params(source, ft_params, '_ft')
+
+if __name__ == "__main__":
+    cli()
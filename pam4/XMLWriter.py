@@ -0,0 +1,125 @@
+import numpy as np
+from xml.sax.saxutils import quoteattr
+
+ex_params = ['Wex', 'Uex', 'Gex', 'Hex']
+ft_params = ['Wft', 'Uft', 'Gft', 'Hft']
+wiener_params = ['a', 'b', 'c1', 'c2', 'd']
+
+block_size = 2**20 # number of matrix entries formatted at once
+
+def formatValue(value):
+    if np.isinf(value):
+        return '-Inf' if value < 0 else 'Inf'
+    return '%.17g' % value
+
+def dataFormat(dtype):
+    """ Shortest format giving back the same values: 17 significant digits for float64, 9 for float32. """
+    return '%.9g' if np.dtype(dtype) == np.float32 else '%.17g'
+
+def writeData(f, mat):
+    """
+    Write the entries of a matrix in column-major order, one block of
+    columns at a time. Implicit operators (e.g. patterns.Toeplitz) are
+    expanded block by block and never materialized as a whole.
+    Args:
+        - f (file): output file.
+        - mat (rows, cols): array, or operator with a columns(start, stop) method.
+    """
+    rows, cols = mat.shape
+    step = max(1, block_size // max(rows, 1))
+    for start in range(0, cols, step):
+        stop = min(cols, start + step)
+        if hasattr(mat, 'columns'):
+            block = mat.columns(start, stop)
+        else:
+            block = np.asarray(mat)[:, start:stop]
+        np.savetxt(f, block.T, fmt=dataFormat(block.dtype))
+
+def writeEye(f, name, adaptability, rows, cols):
+    f.write('    <%s adaptability=%s>\n' % (name, quoteattr(adaptability)))
+    f.write('      <rows>%d</rows>\n' % rows)
+    f.write('      <cols>%d</cols>\n' % cols)
+    f.write('      <data>eye</data>\n')
+    f.write('    </%s>\n' % name)
+
+def writeNonNegMatrix(f, name, mat):
+    rows, cols = mat['data'].shape
+    f.write('    <%s adaptability=%s>\n' % (name, quoteattr(mat['adaptability'])))
+    f.write('      <rows>%d</rows>\n' % rows)
+    f.write('      <cols>%d</cols>\n' % cols)
+    f.write('      <data>\n')
+    writeData(f, mat['data'])
+    f.write('      </data>\n')
+    f.write('    </%s>\n' % name)
+
+def writeMixingParameter(f, A):
+    data = np.asarray(A['data'])
+    f.write('    <A adaptability=%s mixing_type=%s>\n'
+            % (quoteattr(A['adaptability']), quoteattr(A['mixingType'])))
+    f.write('      <ndims>%d</ndims>\n' % data.ndim)
+    for d in data.shape:
+        f.write('      <dim>%d</dim>\n' % d)
+    f.write('      <type>%s</type>\n' % ('complex' if np.iscomplexobj(data) else 'real'))
+    f.write('      <data>\n')
+    if np.iscomplexobj(data):
+        # real part then imaginary part of each frequency bin (convolutive mixing)
+        for i in range(data.shape[-1]):
+            writeData(f, data[:, :, i].real)
+            writeData(f, data[:, :, i].imag)
+    else:
+        writeData(f, np.reshape(data, (data.shape[0], -1), order='F'))
+    f.write('      </data>\n')
+    f.write('    </A>\n')
+
+def writeParams(f, source, params):
+    """ Write excitation or filter parameters, missing U and G being identity. """
+    W, U, G, H = params
+    if W not in source:
+        return
+    writeNonNegMatrix(f, W, source[W])
+    K = source[W]['data'].shape[1]
+    for param in [U, G]:
+        if param in source:
+            writeNonNegMatrix(f, param, source[param])
+            K = source[param]['data'].shape[1]
+        else:
+            writeEye(f, param, 'fixed', K, K)
+    writeNonNegMatrix(f, H, source[H])
+
+def writeSource(f, source):
+    if 'name' in source:
+        f.write('  <source name=%s>\n' % quoteattr(source['name']))
+    else:
+        f.write('  <source>\n')
+
+    if 'wiener' in source:
+        f.write('    <wiener>\n')
+        for param in wiener_params:
+            f.write('      <%s>%s</%s>\n' % (param, formatValue(source['wiener'][param]), param))
+        f.write('    </wiener>\n')
+
+    writeMixingParameter(f, source['A'])
+    writeParams(f, source, ex_params)
+    writeParams(f, source, ft_params)
+    f.write('  </source>\n')
+
+def writeXML(fname, data):
+    """
+    Write the FASST input file of a separation, streaming each matrix to
+    the file instead of building the whole document in memory.
+    Args:
+        - fname (str): path to the .xml file.
+        - data (dict): FASST_data structure, as built in separate.py.
+    """
+    with open(fname, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<sources>\n')
+        if 'iterations' in data:
+            f.write('  <iterations>%d</iterations>\n' % int(data['iterations']))
+        f.write('  <tfr_type>%s</tfr_type>\n' % data['tfr_type'])
+        f.write('  <wlen>%d</wlen>\n' % data['wlen'])
+        if 'nbin' in data:
+            f.write('  <nbin>%d</nbin>\n' % data['nbin'])
+        for source in data['sources']:
+            writeSource(f, source)
+        f.write('</sources>\n')
@@ -0,0 +1,14 @@
+#
+# Informed source separation (FASST) and blind source separation scripts.
+#
+# Modules are imported on demand (e.g. `from pam4 import engine`): importing
+# them does no work, and matplotlib, scipy and torch are only loaded by the
+# functions that use them (torch by online and utils). The command line
+# entry points are the cli() functions of the modules, called by the scripts
+# of the repository root or by python -m pam4.<module>:
+# * separate, batch, sweep, reconstruct : informed source separation,
+# * metrics, benchmark : separation quality and performance,
+# * XMLReader : plots of the estimated source parameters,
+# * BSS, online : blind source separation.
+#
+###########################################################################
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+#
+# Audio I/O shared by the separation scripts:
+# * WavFile : memory-mapped access to a .wav file, the samples being a
+#   zero-copy view of the file (e.g. int16), converted to float only for the
+#   slices or chunks that are read.
+# * WavWriter : streaming 16 bits .wav writer, with an optional peak
+#   normalization done by a final in-place pass over the file, so that
+#   memory does not depend on the length of the signal.
+#
+###########################################################################
+
+import os
+import struct
+import hashlib
+import numpy as np
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+HEADER_SIZE = 44
+
+chunk_size = 2**16 # number of samples processed at once
+
+
+class WavFile(object):
+    """
+    Memory-mapped .wav file.
+    Attributes:
+        - filename (str): path to the .wav file.
+        - sample_rate (int): sampling rate.
+        - nb_channels (int): number of channels.
+        - nb_samples (int): number of samples per channel.
+        - samples (nb_samples, nb_channels): zero-copy view of the samples in
+          their stored type (uint8, int16, int32 or float32, 3 bytes records
+          for 24 bits PCM).
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            riff, size, wave = struct.unpack('<4sI4s', f.read(12))
+            if riff != b'RIFF' or wave != b'WAVE':
+                raise ValueError('%s is not a RIFF/WAVE file' % filename)
+
+            fmt = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError('%s has no data chunk' % filename)
+                chunk_id, chunk_size = struct.unpack('<4sI', header)
+                if chunk_id == b'fmt ':
+                    fmt = f.read(chunk_size)
+                    f.seek(chunk_size % 2, 1)
+                elif chunk_id == b'data':
+                    offset = f.tell()
+                    break
+                else:
+                    f.seek(chunk_size + chunk_size % 2, 1)
+
+        if fmt is None:
+            raise ValueError('%s has no fmt chunk' % filename)
+        tag, self.nb_channels, self.sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+        if tag == WAVE_FORMAT_EXTENSIBLE:
+            tag = struct.unpack('<H', fmt[24:26])[0]
+
+        formats = {(WAVE_FORMAT_PCM, 8): 'u1', (WAVE_FORMAT_PCM, 16): '<i2', (WAVE_FORMAT_PCM, 24): 'V3',
+                   (WAVE_FORMAT_PCM, 32): '<i4', (WAVE_FORMAT_IEEE_FLOAT, 32): '<f4'}
+        if (tag, bits) not in formats:
+            raise ValueError('%s: unsupported format %d with %d bits' % (filename, tag, bits))
+        self.dtype = np.dtype(formats[(tag, bits)])
+
+        # Streamed files may have an unknown (0 or 0xFFFFFFFF) data size
+        available = os.path.getsize(filename) - offset
+        if chunk_size in (0, 0xFFFFFFFF) or chunk_size > available:
+            chunk_size = available
+        self.nb_samples = chunk_size // block_align
+
+        if self.nb_samples > 0:
+            self.samples = np.memmap(filename, dtype=self.dtype, mode='r', offset=offset,
+                                     shape=(self.nb_samples, self.nb_channels))
+        else:
+            self.samples = np.zeros((0, self.nb_channels), dtype=self.dtype)
+
+    def __len__(self):
+        return self.nb_samples
+
+    def to_float(self, samples, dtype=np.float32):
+        """ Convert stored samples to float in [-1, 1]. """
+        if self.dtype.kind == 'f':
+            return samples.astype(dtype)
+        if self.dtype.kind == 'u':
+            return (samples.astype(dtype) - 128) / 128
+        if self.dtype.kind == 'V':
+            # 24 bits little-endian: the 3 bytes are shifted to the top of an
+            # int32, the arithmetic shift back extending the sign
+            b = np.ascontiguousarray(samples).view('u1').reshape(samples.shape + (3,)).astype(np.int32)
+            samples = (b[..., 0] << 8 | b[..., 1] << 16 | b[..., 2] << 24) >> 8
+        return samples.astype(dtype) / 2**(8 * self.dtype.itemsize - 1)
+
+    def read(self, start=0, stop=None, dtype=np.float32):
+        """ Samples [start, stop) converted to float, (stop-start, nb_channels). """
+        return self.to_float(self.samples[start:stop], dtype)
+
+    def chunks(self, size=chunk_size, dtype=np.float32):
+        """ Iterate over the samples, converted to float size samples at a time. """
+        for start in range(0, self.nb_samples, size):
+            yield self.read(start, start + size, dtype)
+
+    def digest(self):
+        """ SHA-1 of the audio content (format, rate and samples), independent
+        of the other chunks and metadata of the file. """
+        h = hashlib.sha1(('%s/%d/%d' % (self.dtype.str, self.sample_rate, self.nb_channels)).encode())
+        for start in range(0, self.nb_samples, chunk_size):
+            h.update(np.ascontiguousarray(self.samples[start:start + chunk_size]))
+        return h.hexdigest()
+
+
+class WavWriter(object):
+    """
+    Streaming 16 bits PCM .wav writer.
+    With normalize=True the signal is scaled so that its peak is at full
+    scale, as BSS.writeAudio did: the chunks are staged as float32 in the
+    file while the running peak is tracked, then converted in place to int16
+    when the writer is closed. Otherwise samples in [-1, 1] are clipped.
+    Args:
+        - filename (str): path to the .wav file.
+        - sample_rate (int): sampling rate.
+        - nb_channels (int): number of channels, default to the number of
+          columns of the first chunk.
+        - normalize (bool): peak normalization.
+    """
+    def __init__(self, filename, sample_rate, nb_channels=None, normalize=False):
+        self.filename = filename
+        self.sample_rate = sample_rate
+        self.nb_channels = nb_channels
+        self.normalize = normalize
+        self.nb_samples = 0
+        self.peak = 0.
+        self.f = open(filename, 'w+b')
+        self.f.write(b'\0' * HEADER_SIZE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, y):
+        """ Append the samples y (m, nb_channels), or (m,) for a mono file. """
+        y = np.asarray(y)
+        if y.ndim == 1:
+            y = y[:, None]
+        if self.nb_channels is None:
+            self.nb_channels = y.shape[1]
+        if y.shape[1] != self.nb_channels:
+            raise ValueError('Expected %d channels, got %d' % (self.nb_channels, y.shape[1]))
+
+        if self.normalize:
+            if len(y):
+                self.peak = max(self.peak, float(np.max(np.abs(y))))
+            self.f.write(y.astype('<f4').tobytes())
+        else:
+            self.f.write(np.int16(np.clip(y * 32768, -32768, 32767)).astype('<i2').tobytes())
+        self.nb_samples += len(y)
+
+    def _rescale(self):
+        """ Convert the staged float32 samples to int16 in place, front to back:
+        the int16 samples of a chunk never overwrite float32 samples not read yet. """
+        scale = 32767 / self.peak if self.peak > 0 else 0.
+        step = chunk_size * self.nb_channels
+        total = self.nb_samples * self.nb_channels
+        for start in range(0, total, step):
+            count = min(step, total - start)
+            self.f.seek(HEADER_SIZE + 4 * start)
+            y = np.frombuffer(self.f.read(4 * count), dtype='<f4')
+            self.f.seek(HEADER_SIZE + 2 * start)
+            self.f.write(np.int16(y * scale).astype('<i2').tobytes())
+        self.f.truncate(HEADER_SIZE + 2 * total)
+
+    def close(self):
+        if self.f.closed:
+            return
+        if self.nb_channels is None:
+            self.nb_channels = 1
+        if self.normalize:
+            self._rescale()
+
+        data_size = 2 * self.nb_samples * self.nb_channels
+        self.f.seek(0)
+        self.f.write(struct.pack('<4sI4s4sIHHIIHH4sI',
+                                 b'RIFF', HEADER_SIZE - 8 + data_size, b'WAVE',
+                                 b'fmt ', 16, WAVE_FORMAT_PCM, self.nb_channels, self.sample_rate,
+                                 2 * self.nb_channels * self.sample_rate, 2 * self.nb_channels, 16,
+                                 b'data', data_size))
+        self.f.close()
+
+
+def read(filename, dtype=np.float64):
+    """
+    Read a whole .wav file.
+    Returns:
+        - x (nb_samples, nb_channels): samples in [-1, 1].
+        - sample_rate (int)
+    """
+    wav = WavFile(filename)
+    return wav.read(dtype=dtype), wav.sample_rate
+
+
+def write(filename, y, sample_rate, normalize=False):
+    """
+    Write a 16 bits .wav file, chunk by chunk.
+    Args:
+        - y (nb_samples, nb_channels) or (nb_samples,): samples.
+        - normalize (bool): peak normalization, otherwise samples in [-1, 1] are clipped.
+    """
+    with WavWriter(filename, sample_rate, normalize=normalize) as writer:
+        for start in range(0, len(y), chunk_size):
+            writer.write(y[start:start + chunk_size])
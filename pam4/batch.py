@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+#
+# Batch source separation: each mixture of a directory or manifest is
+# separated by separate.main in its own workspace (temp/ and results/), the
+# jobs running in a pool of worker processes. A summary index of the outputs
+# and of the wall time of each job is written to <output>/index.json.
+#
+# Manifest formats:
+# * text file: one mixture path per line (empty lines and # comments skipped),
+# * .json file: list of mixture paths, or of objects with a "filename" key and
+#   per-job overrides of the separate.py options, e.g.
+#   [{"filename": "a.wav", "j": 3, "pan1": -0.5}, "b.wav"]
+# Relative paths are resolved from the manifest directory.
+#
+###########################################################################
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import contextlib
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import separate
+
+def list_jobs(inputs):
+    """
+    List the mixtures of a directory or manifest.
+    Args:
+        - inputs (str): directory of .wav files or manifest file.
+    Returns:
+        - jobs (list of dict): 'filename' of each mixture and its option overrides.
+    """
+    if os.path.isdir(inputs):
+        return [{'filename': os.path.abspath(f)} for f in sorted(glob.glob(os.path.join(inputs, '*.wav')))]
+
+    root = os.path.dirname(os.path.abspath(inputs))
+    with open(inputs) as f:
+        if inputs.endswith('.json'):
+            entries = json.load(f)
+        else:
+            entries = [l.strip() for l in f if l.strip() and not l.strip().startswith('#')]
+
+    jobs = []
+    for entry in entries:
+        job = dict(entry) if isinstance(entry, dict) else {'filename': entry}
+        job['filename'] = os.path.join(root, job['filename'])
+        jobs.append(job)
+    return jobs
+
+def workspace_names(jobs):
+    """ Unique workspace name of each job, from the mixture file names. """
+    names, seen = [], {}
+    for job in jobs:
+        name = os.path.splitext(os.path.basename(job['filename']))[0]
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else '%s_%d' % (name, seen[name]))
+    return names
+
+def run_job(options, workspace):
+    """
+    Worker: separate one mixture in its own workspace.
+    Args:
+        - options (argparse.Namespace): separate.py options of the job.
+        - workspace (str): job directory, with temp/, results/ and log.txt.
+    Returns:
+        - summary (dict): outputs, status and wall time of the job.
+    """
+    tmp_dir = os.path.join(workspace, 'temp/')
+    results_dir = os.path.join(workspace, 'results/')
+    os.makedirs(workspace, exist_ok=True)
+
+    summary = {'filename': options.filename, 'workspace': workspace}
+    start = time.time()
+    with open(os.path.join(workspace, 'log.txt'), 'w') as log:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            try:
+                separate.run(options, tmp_dir=tmp_dir, results_dir=results_dir)
+                summary['status'] = 'ok'
+            except Exception:
+                traceback.print_exc()
+                summary['status'] = 'failed'
+    summary['wall_time'] = time.time() - start
+    summary['outputs'] = sorted(glob.glob(os.path.join(results_dir, '*.wav')))
+    return summary
+
+def main(inputs, output, processes, defaults):
+    """
+    Separate all the mixtures of a directory or manifest.
+    Args:
+        - inputs (str): directory of .wav files or manifest file.
+        - output (str): root directory of the job workspaces and of index.json.
+        - processes (int): number of jobs running at the same time.
+        - defaults (argparse.Namespace): separate.py options shared by all jobs.
+    Returns:
+        - index (dict): summary of the batch, also written to <output>/index.json.
+    """
+    jobs = list_jobs(inputs)
+    names = workspace_names(jobs)
+    os.makedirs(output, exist_ok=True)
+    print('> %d jobs, %d processes' % (len(jobs), processes))
+
+    start = time.time()
+    summaries = {}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {}
+        for name, job in zip(names, jobs):
+            options = argparse.Namespace(**vars(defaults))
+            for key, value in job.items():
+                setattr(options, key, value)
+            workspace = os.path.abspath(os.path.join(output, name))
+            futures[pool.submit(run_job, options, workspace)] = name
+
+        for future in as_completed(futures):
+            name = futures[future]
+            summaries[name] = future.result()
+            print('>> %s: %s in %.1f s' % (name, summaries[name]['status'], summaries[name]['wall_time']))
+
+    index = {'inputs': os.path.abspath(inputs),
+             'processes': processes,
+             'wall_time': time.time() - start,
+             'jobs': [dict(name=name, **summaries[name]) for name in names]}
+    with open(os.path.join(output, 'index.json'), 'w') as f:
+        json.dump(index, f, indent=2)
+    return index
+
+#%% main call
+def cli():
+    """ Command line entry point: python batch.py, or python -m pam4.batch. """
+    parser = argparse.ArgumentParser(description='Batch informed audio source separation.')
+
+    parser.add_argument('inputs',
+                        type=str, help='Directory of mixtures wave files, or manifest file.')
+
+    parser.add_argument('-o', '--output', default='batch',
+                        type=str, help='Root directory of the job workspaces.', dest='output')
+
+    parser.add_argument('-P', '--processes', default=os.cpu_count(),
+                        type=int, help='Number of jobs running at the same time.', dest='processes')
+
+    separate.add_arguments(parser)
+
+    options = parser.parse_args()
+    inputs, output, processes = options.inputs, options.output, options.processes
+    for key in ['inputs', 'output', 'processes']:
+        delattr(options, key)
+
+    index = main(inputs, output, processes, options)
+    sys.exit(any(job['status'] != 'ok' for job in index['jobs']))
+
+if __name__ == "__main__":
+    cli()
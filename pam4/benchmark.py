@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+#
+# Benchmark of the separation engines on synthetic stereo mixtures.
+# Each case is a mixture of J known sources (harmonic notes or noise bursts)
+# panned with the pan law of the templates (template.pan_law), written to
+# <output>/<case>/ with its ground truth (sources/source_<j>.wav, which can be
+# given as references to metrics.py, and pans.json).
+# The stages below are timed (wall and CPU time) and memory-profiled
+# (tracemalloc peak of the Python and NumPy allocations, measured on a second
+# run of the stage so that tracing does not slow down the timed one) on each case:
+# * template : initial sources from the templates (separate.build_sources),
+# * statistics : STFT and mixture covariance (engine.mixture_statistics),
+# * em : EM estimation of the source parameters (engine.estimate_source_parameters),
+# * wiener : Wiener filtering and inverse STFT of the sources,
+# * bss : relative gradient separation (BSS.relative_gradient_descend),
+# * online : mini-batch training of the separation matrix (online.train_stream),
+#   skipped when torch is not installed (tensors are not seen by tracemalloc).
+# The report, written to <output>/report.json, can be compared with the
+# report of another version with -compare.
+#
+###########################################################################
+
+import os
+import gc
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import subprocess
+
+import numpy as np
+
+from . import audio
+from . import engine
+from . import template
+from . import separate
+
+stages = ['template', 'statistics', 'em', 'wiener', 'bss', 'online']
+
+# Templates of the sources of a case, in order, the remaining ones being 'other'
+instruments = ['v', 'g', 'p', 't', 's', 'd']
+
+def synthesize(duration, J, sr_hz=16000, seed=0):
+    """
+    Synthetic stereo mixture of J sources with known pans.
+    Even sources are sequences of harmonic notes, odd sources are sequences
+    of noise bursts, both with exponential decays.
+    Args:
+        - duration (float): length in seconds.
+        - J (int): number of sources.
+        - sr_hz (int): sampling rate.
+        - seed (int): seed of the notes and pans.
+    Returns:
+        - s (T, J): sources.
+        - pans (J,): pan of each source, in [-0.9, 0.9].
+        - x (T, 2): mixture, peak at 0.9.
+    """
+    rng = np.random.default_rng(seed)
+    T = int(duration * sr_hz)
+    t = np.arange(T) / sr_hz
+    s = np.zeros((T, J))
+    for j in range(J):
+        start = 0
+        while start < T:
+            length = min(int(rng.uniform(0.15, 0.5) * sr_hz), T - start)
+            tau = t[:length]
+            envelope = np.exp(-tau / rng.uniform(0.05, 0.3))
+            if j % 2 == 0:
+                f0 = 110 * 2 ** (rng.integers(0, 36) / 12)
+                note = sum(np.sin(2 * np.pi * h * f0 * tau) / h for h in range(1, 6) if h * f0 < sr_hz / 2)
+            else:
+                note = rng.standard_normal(length)
+            s[start:start + length, j] = rng.uniform(0.3, 1) * envelope * note
+            start += length
+
+    pans = np.linspace(-0.9, 0.9, J) if J > 1 else np.zeros(1)
+    pans = rng.permutation(pans)
+    A = np.concatenate([template.pan_law(pan) for pan in pans], axis=1)
+    x = s @ A.T
+    scale = 0.9 / np.max(np.abs(x))
+    return s * scale, pans, x * scale
+
+def write_case(dirname, s, pans, x, sr_hz):
+    """ Write the mixture, ground-truth sources and pans of a case. Returns the mixture path. """
+    os.makedirs(os.path.join(dirname, 'sources'), exist_ok=True)
+    for j in range(s.shape[1]):
+        audio.write(os.path.join(dirname, 'sources', 'source_%d.wav' % j), s[:, j], sr_hz)
+    with open(os.path.join(dirname, 'pans.json'), 'w') as f:
+        json.dump([float(pan) for pan in pans], f)
+    mixture_wavname = os.path.join(dirname, 'mix.wav')
+    audio.write(mixture_wavname, x, sr_hz)
+    return mixture_wavname
+
+def measure(function, *args, **kwargs):
+    """
+    Call function(*args, **kwargs) twice: the wall time and CPU time (all
+    threads) are measured on a first run without tracing, whose overhead on
+    each allocation would inflate them, and the peak of traced memory on a
+    second run under tracemalloc. The global NumPy random state is restored
+    between the runs, so that both compute the same result.
+    Returns:
+        - result: value returned by function.
+        - stats (dict): wall_time and cpu_time in seconds, peak_memory in bytes.
+    """
+    state = np.random.get_state()
+    gc.collect()
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = function(*args, **kwargs)
+    stats = {'wall_time': time.perf_counter() - wall,
+             'cpu_time': time.process_time() - cpu}
+    del result
+
+    np.random.set_state(state)
+    gc.collect()
+    tracemalloc.start()
+    result = function(*args, **kwargs)
+    stats['peak_memory'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, stats
+
+def run_case(mixture_wavname, J, pans, options):
+    """
+    Run the benchmarked stages on one mixture.
+    Args:
+        - mixture_wavname (str): path to the mixtures .wav file.
+        - J (int): number of sources.
+        - pans (J,): pans of the sources, used by the templates.
+        - options (argparse.Namespace): epoch, bss_iterations, online_steps,
+          window, batch_windows, dtype, threads and stages of the benchmark.
+    Returns:
+        - results (dict): stats of each stage (see measure), with the sizes and
+          final criteria of the stages.
+    """
+    results = {}
+    counts = [instruments[:J].count(i) for i in instruments]
+    np.random.seed(0)
+
+    (X, Rx, sr_hz, nbSamples), stats = measure(engine.mixture_statistics, mixture_wavname, separate.wlen,
+                                               dtype=options.dtype)
+    nbin, N = X.shape[:2]
+    if 'statistics' in options.stages:
+        results['statistics'] = dict(stats, frames=N, bins=nbin)
+
+    sources, stats = measure(separate.build_sources, J, *counts, pans, N, nbin, dtype=options.dtype)
+    if 'template' in options.stages:
+        results['template'] = stats
+        results['template']['free_parameters'] = int(sum(p['data'].size for s in sources for p in engine.factors(s)
+                                                            if p['adaptability'] == 'free'))
+
+    if 'em' in options.stages or 'wiener' in options.stages:
+        (sources, loglik), stats = measure(engine.estimate_source_parameters, sources, Rx, options.epoch,
+                                           threads=options.threads)
+        if 'em' in options.stages:
+            results['em'] = dict(stats, iterations=len(loglik), loglik=float(loglik[-1]))
+
+    if 'wiener' in options.stages:
+        def wiener():
+            return [engine.istft(Y, separate.wlen, nbSamples)
+                    for Y in engine.estimate_sources(X, sources, threads=options.threads)]
+        _, results['wiener'] = measure(wiener)
+    del X, Rx
+
+    if 'bss' in options.stages:
+        from . import BSS
+        x, sr_hz = audio.read(mixture_wavname, options.dtype)
+        (y, B, loss), stats = measure(BSS.relative_gradient_descend, x, max_iter=options.bss_iterations,
+                                      dtype=options.dtype)
+        results['bss'] = dict(stats, iterations=len(loss), loss=float(min(loss)))
+
+    if 'online' in options.stages:
+        try:
+            from . import online
+        except ImportError as e:
+            results['online'] = {'status': 'skipped', 'error': str(e)}
+        else:
+            _, results['online'] = measure(online.train_stream, mixture_wavname, options.window,
+                                           options.batch_windows, options.online_steps, checkpoint=None)
+            results['online']['steps'] = options.online_steps
+
+    return results
+
+def environment():
+    """ Versions and machine of the benchmark run. """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit or None, 'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'system': platform.system(), 'cpu_count': os.cpu_count()}
+
+def compare(old, new):
+    """
+    Print the ratio new/old of the wall time and peak memory of each stage of
+    the cases found in both reports.
+    Args:
+        - old, new (dict): benchmark reports.
+    """
+    cases = {(c['duration'], c['sources']): c['stages'] for c in old['cases']}
+    print('%-8s %-3s %-10s %10s %10s' % ('duration', 'J', 'stage', 'time', 'memory'))
+    for case in new['cases']:
+        key = (case['duration'], case['sources'])
+        for stage, stats in case['stages'].items():
+            previous = cases.get(key, {}).get(stage)
+            if previous is None or 'wall_time' not in stats or 'wall_time' not in previous:
+                continue
+            print('%-8g %-3d %-10s %9.2fx %9.2fx' % (key[0], key[1], stage,
+                                                     stats['wall_time'] / max(previous['wall_time'], 1e-9),
+                                                     stats['peak_memory'] / max(previous['peak_memory'], 1)))
+
+def main(output, durations, nb_sources, options, sr_hz=16000, repeat=1):
+    """
+    Benchmark the stages on synthetic mixtures of increasing durations and
+    numbers of sources.
+    Args:
+        - output (str): directory of the synthetic mixtures and of report.json.
+        - durations (list of float): durations of the mixtures in seconds.
+        - nb_sources (list of int): numbers of sources of the mixtures.
+        - options (argparse.Namespace): stage options, see run_case.
+        - sr_hz (int): sampling rate of the mixtures.
+        - repeat (int): number of runs of each case, the fastest being kept.
+    Returns:
+        - report (dict): environment, options and stats of each case, also
+          written to <output>/report.json.
+    """
+    os.makedirs(output, exist_ok=True)
+    report = {'environment': environment(), 'options': vars(options), 'sr_hz': sr_hz,
+              'repeat': repeat, 'cases': []}
+    for duration in durations:
+        for J in nb_sources:
+            name = '%gs_%dsources' % (duration, J)
+            s, pans, x = synthesize(duration, J, sr_hz)
+            mixture_wavname = write_case(os.path.join(output, name), s, pans, x, sr_hz)
+
+            runs = [run_case(mixture_wavname, J, pans, options) for r in range(repeat)]
+            stats = {stage: min((run[stage] for run in runs), key=lambda r: r.get('wall_time', 0))
+                     for stage in runs[0]}
+            report['cases'].append({'name': name, 'duration': duration, 'sources': J, 'stages': stats})
+            print('> %s: %s' % (name, ', '.join('%s %.2f s' % (stage, r['wall_time'])
+                                                for stage, r in stats.items() if 'wall_time' in r)))
+
+    with open(os.path.join(output, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+#%% main call
+def cli():
+    """ Command line entry point: python benchmark.py, or python -m pam4.benchmark. """
+    parser = argparse.ArgumentParser(description='Benchmark of the separation engines on synthetic mixtures.')
+
+    parser.add_argument('-o', '--output', default='benchmark',
+                        type=str, help='Directory of the synthetic mixtures and of report.json.', dest='output')
+
+    parser.add_argument('-durations', default=[5, 10, 20], nargs='+',
+                        type=float, help='Durations of the mixtures in seconds.', dest='durations')
+
+    parser.add_argument('-J', '--nb_sources', default=[2, 3, 4], nargs='+',
+                        type=int, help='Numbers of sources of the mixtures.', dest='nb_sources')
+
+    parser.add_argument('-stages', default=stages, nargs='+', choices=stages,
+                        help='Benchmarked stages.', dest='stages')
+
+    parser.add_argument('-epoch', '--nb_epoch', default=20,
+                        type=int, help='Number of EM iterations.', dest='epoch')
+
+    parser.add_argument('-bss_iter', default=50,
+                        type=int, help='Maximum number of relative gradient iterations.', dest='bss_iterations')
+
+    parser.add_argument('-steps', '--online_steps', default=50,
+                        type=int, help='Number of online training steps.', dest='online_steps')
+
+    parser.add_argument('-bs', '--block_size', default=2048,
+                        type=int, help='Number of samples per window of online training.', dest='window')
+
+    parser.add_argument('-bw', '--batch_windows', default=8,
+                        type=int, help='Number of windows per mini-batch of online training.', dest='batch_windows')
+
+    parser.add_argument('-dtype', default='float64', choices=separate.dtypes,
+                        help='Precision of the templates, statistics, EM, Wiener and BSS stages.', dest='dtype')
+    parser.add_argument('-threads', default=1, type=int,
+                        help='Number of threads sharing the frequency bins of the EM and Wiener stages.', dest='threads')
+
+    parser.add_argument('-r', '--repeat', default=1,
+                        type=int, help='Number of runs of each case, the fastest being kept.', dest='repeat')
+
+    parser.add_argument('-compare', default=None,
+                        type=str, help='Report of another version to compare with.', dest='compare')
+
+    options = parser.parse_args()
+    output, durations, nb_sources, repeat, old = (options.output, options.durations, options.nb_sources,
+                                                   options.repeat, options.compare)
+    for key in ['output', 'durations', 'nb_sources', 'repeat', 'compare']:
+        delattr(options, key)
+
+    report = main(output, durations, nb_sources, options, repeat=repeat)
+    if old is not None:
+        with open(old) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    cli()
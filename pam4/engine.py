@@ -0,0 +1,775 @@
+#!/usr/bin/env python3
+#
+# In-process NumPy implementation of the FASST source separation stages:
+# * compute_mixture_covariance_matrix : STFT of the mixture and empirical
+#   spatial covariance per time-frequency bin (mixture_statistics caches them
+#   on disk, keyed by the audio content).
+# * estimate_source_parameters : EM algorithm with multiplicative updates of
+#   the NMF-like spectral parameters (Wex, Uex, Gex, Hex) and closed-form
+#   update of the instantaneous mixing matrix A. estimate_multiresolution
+#   runs it coarse-to-fine on time-decimated frames.
+# * wiener_filter / reconstruct : multichannel Wiener filtering, honoring
+#   the 'wiener' parameters of the sources, and inverse STFT.
+#
+# With instantaneous mixing, the E-step and the Wiener filters of the
+# frequency bins are independent: given threads > 1, the bins are split into
+# shards processed by a pool of threads sharing the arrays (map_shards), the
+# statistics shared by all the bins (mixing matrix, columns of Uex, Gex, Hex,
+# log-likelihood) being reduced from the partial sums of the shards.
+#
+# All the stages run in the precision of their inputs: float64 by default,
+# or float32 (complex64 STFT and covariances) when the mixture statistics
+# and the sources are built with dtype=np.float32, which halves the memory
+# and speeds up the batched linear algebra.
+#
+# Sources are described by the same dictionaries as the ones built in
+# template.py, so that this engine is a drop-in for the FASST binaries.
+#
+###########################################################################
+
+import numpy as np
+import os
+import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from . import audio
+from . import profiling
+
+ex_params = ['Wex', 'Uex', 'Gex', 'Hex']
+
+# Floor of the powers, also in float32 (it is a normal float32 number, and the
+# ratios of the multiplicative updates stay far from overflow). A Python float,
+# so that it does not promote float32 arrays to float64.
+eps = float(np.finfo(float).eps)
+
+
+def stft(x, wlen):
+    """
+    Short-time Fourier transform with a sine window and half overlap.
+    Args:
+        - x (nbSamples, I): multichannel signal, float32 or float64.
+        - wlen (int): window length in samples, multiple of 4.
+    Returns:
+        - X (nbin, N, I): STFT coefficients, with N = ceil(nbSamples/wlen*2),
+          complex64 for a float32 signal.
+    """
+    nbSamples, I = x.shape
+    hop = wlen // 2
+    N = int(np.ceil(nbSamples / hop))
+
+    window = np.sin((np.arange(wlen) + .5) / wlen * np.pi).astype(x.dtype)
+
+    # Frame n covers samples [(n-1)*hop, (n+1)*hop) of the original signal
+    padded = np.zeros(((N + 1) * hop, I), dtype=x.dtype)
+    padded[hop:hop + nbSamples] = x
+    frames = np.lib.stride_tricks.sliding_window_view(padded, wlen, axis=0)[::hop]
+    return np.fft.rfft(frames * window, axis=-1).transpose(2, 0, 1)
+
+
+def istft(X, wlen, nbSamples):
+    """
+    Inverse of stft, by weighted overlap-add.
+    Args:
+        - X (nbin, N, I): STFT coefficients.
+        - wlen (int): window length in samples.
+        - nbSamples (int): length of the output signal.
+    Returns:
+        - x (nbSamples, I): multichannel signal.
+    """
+    nbin, N, I = X.shape
+    hop = wlen // 2
+
+    window = np.sin((np.arange(wlen) + .5) / wlen * np.pi).astype(X.real.dtype)
+    frames = np.fft.irfft(X.transpose(1, 2, 0), n=wlen, axis=-1) * window
+
+    # Half overlap: the first half of frame n and the second half of frame
+    # n-1 add up in the block n of hop samples
+    frames = frames.reshape(N, I, 2, hop)
+    x = np.zeros((N + 1, I, hop), dtype=window.dtype)
+    x[:N] += frames[:, :, 0]
+    x[1:] += frames[:, :, 1]
+    norm = np.zeros((N + 1, hop), dtype=window.dtype)
+    norm[:N] += window[:hop] ** 2
+    norm[1:] += window[hop:] ** 2
+
+    x = (x / np.maximum(norm, eps)[:, None, :]).transpose(0, 2, 1).reshape(-1, I)
+    return x[hop:hop + nbSamples]
+
+
+def compute_mixture_covariance_matrix(X):
+    """
+    Empirical spatial covariance of the mixture in each time-frequency bin.
+    Args:
+        - X (nbin, N, I): STFT of the mixture.
+    Returns:
+        - Rx (nbin, N, I, I): hermitian covariance matrices x x^H.
+    """
+    return X[..., :, None] * X[..., None, :].conj()
+
+
+def statistics_key(mixture_wavname, wlen, tfr_type='STFT', dtype=None):
+    """
+    Cache key of the mixture statistics: audio content hash, transform,
+    window length and precision (dtype, None for files that do not depend
+    on it, e.g. the ones of the FASST binaries).
+    """
+    key = '%s_%s_%d' % (audio.WavFile(mixture_wavname).digest(), tfr_type, wlen)
+    return key if dtype is None else '%s_%s' % (key, np.dtype(dtype).name)
+
+
+def mixture_statistics(mixture_wavname, wlen, cache_dir=None, tfr_type='STFT', dtype=np.float64):
+    """
+    STFT and spatial covariance of a mixture, cached on disk.
+    The arrays are stored as .npy files in <cache_dir>/<key>/, key being
+    given by statistics_key, and memory-mapped when they are reused, so
+    that runs on the same mixture (other templates, pans, iterations...)
+    skip this stage.
+    Args:
+        - mixture_wavname (str): path to the mixtures .wav file.
+        - wlen (int): STFT window length.
+        - cache_dir (str): cache directory, None to disable the cache.
+        - tfr_type (str): time-frequency transform, only 'STFT' is supported.
+        - dtype (dtype): precision of the statistics, np.float32 for complex64 arrays.
+    Returns:
+        - X (nbin, N, I): STFT of the mixture.
+        - Rx (nbin, N, I, I): mixture covariance.
+        - sr_hz (int): sampling rate.
+        - nbSamples (int): length of the mixture.
+    """
+    if tfr_type != 'STFT':
+        raise ValueError("Unsupported time-frequency transform '%s'" % tfr_type)
+
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, statistics_key(mixture_wavname, wlen, tfr_type, dtype))
+        if os.path.exists(os.path.join(path, 'info.json')):
+            with open(os.path.join(path, 'info.json')) as f:
+                info = json.load(f)
+            return (np.load(os.path.join(path, 'X.npy'), mmap_mode='r'),
+                    np.load(os.path.join(path, 'Rx.npy'), mmap_mode='r'),
+                    info['sr_hz'], info['nbSamples'])
+
+    x, sr_hz = audio.read(mixture_wavname, dtype)
+    X = stft(x, wlen)
+    if cache_dir is None:
+        return X, compute_mixture_covariance_matrix(X), sr_hz, len(x)
+
+    # Written in a temporary directory renamed at the end, so that an
+    # interrupted run never leaves a partial entry
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    os.makedirs(tmp_path, exist_ok=True)
+    np.save(os.path.join(tmp_path, 'X.npy'), X)
+    nbin, N, I = X.shape
+    Rx = np.lib.format.open_memmap(os.path.join(tmp_path, 'Rx.npy'), mode='w+',
+                                   dtype=X.dtype, shape=(nbin, N, I, I))
+    step = max(1, nbin // 16)
+    for f in range(0, nbin, step):
+        Rx[f:f + step] = compute_mixture_covariance_matrix(X[f:f + step])
+    Rx.flush()
+    del Rx
+    with open(os.path.join(tmp_path, 'info.json'), 'w') as f:
+        json.dump({'mixture': os.path.abspath(mixture_wavname), 'tfr_type': tfr_type,
+                   'wlen': wlen, 'dtype': np.dtype(dtype).name, 'sr_hz': sr_hz, 'nbSamples': len(x)}, f)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        # Reused only if the entry was written meanwhile by another process,
+        # any other failure (permissions, full disk...) is raised
+        if not os.path.exists(os.path.join(path, 'info.json')):
+            raise
+    return mixture_statistics(mixture_wavname, wlen, cache_dir, tfr_type, dtype)
+
+
+def shard_bounds(nbin, count):
+    """ [start, stop) of count contiguous shards of (almost) the same size covering nbin frequency bins. """
+    edges = np.linspace(0, nbin, max(1, min(count, nbin)) + 1).astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def map_shards(function, bounds, threads=1):
+    """
+    Apply function to frequency shards in a pool of threads. The shards share
+    the arrays of the caller (e.g. a memory-mapped Rx), and NumPy releases the
+    GIL in the batched linear algebra, so that they run on all the cores.
+    Args:
+        - function (callable): function(start, stop) of a shard of bins.
+        - bounds (list of (int, int)): [start, stop) of each shard.
+        - threads (int): number of threads, 1 to run the shards in the calling thread.
+    Returns:
+        - results (list): value of function on each shard, in order.
+    """
+    if threads <= 1 or len(bounds) == 1:
+        return [function(start, stop) for start, stop in bounds]
+    with ThreadPoolExecutor(max_workers=min(threads, len(bounds))) as pool:
+        return list(pool.map(lambda shard: function(*shard), bounds))
+
+
+def factors(source):
+    """
+    Ordered list of the excitation parameters of a source, so that its
+    spectral power is the product of the list. Missing Uex/Gex are identity.
+    Args:
+        - source (dict): source as built in template.py.
+    """
+    return [source[p] for p in ex_params if p in source]
+
+
+def chain(mats):
+    """
+    Product of a list of matrices (None for an empty list), in the cheapest
+    multiplication order. Matrices may be implicit operators such as
+    patterns.Toeplitz, which are then only applied to their neighbours.
+    """
+    if not mats:
+        return None
+    n = len(mats)
+    dims = [mats[0].shape[0]] + [mat.shape[1] for mat in mats]
+
+    # Matrix chain ordering: cost[i][k] is the cost of the product mats[i:k+1]
+    cost = [[0] * n for _ in range(n)]
+    split = [[0] * n for _ in range(n)]
+    for length in range(1, n):
+        for i in range(n - length):
+            k = i + length
+            cost[i][k], split[i][k] = min(
+                (cost[i][m] + cost[m + 1][k] + dims[i] * dims[m + 1] * dims[k + 1], m)
+                for m in range(i, k))
+
+    def product(i, k):
+        if i == k:
+            return mats[i]
+        m = split[i][k]
+        return product(i, m) @ product(m + 1, k)
+
+    return product(0, n - 1)
+
+
+def source_power(source):
+    """
+    Spectral power V = Wex Uex Gex Hex of a source.
+    Args:
+        - source (dict): source as built in template.py.
+    Returns:
+        - V (nbin, N): nonnegative spectral power.
+    """
+    # Clipped, products with implicit operators being exact up to roundoff
+    return np.maximum(np.asarray(chain([p['data'] for p in factors(source)])), 0)
+
+
+def mixing_matrix(sources):
+    """
+    Stack the instantaneous mixing vectors of all sources.
+    Args:
+        - sources (list of dict): sources as built in template.py.
+    Returns:
+        - A (I, J): real mixing matrix.
+    """
+    for source in sources:
+        if source['A']['mixingType'] != 'inst':
+            raise ValueError("Only 'inst' mixing is supported, got '%s' for %s"
+                             % (source['A']['mixingType'], source['name']))
+    return np.concatenate([np.reshape(s['A']['data'], (-1, 1)) for s in sources], axis=1)
+
+
+def expectation(Rx, A, V, noise, threads=1):
+    """
+    E-step of the EM algorithm, batched over sources and time-frequency bins.
+    With threads > 1, the frequency bins are split into as many shards,
+    processed in parallel, whose partial sums are then reduced.
+    Args:
+        - Rx (nbin, N, I, I): mixture covariance.
+        - A (I, J): mixing matrix.
+        - V (J, nbin, N): spectral power of the sources.
+        - noise (float): variance of the isotropic noise added to the model.
+        - threads (int): number of frequency shards processed at once.
+    Returns:
+        - Rxs (I, J): sum over bins of the mixture/sources cross-covariance.
+        - Rss (J, J): sum over bins of the posterior sources covariance.
+        - xi (J, nbin, N): posterior power of each source.
+        - loglik (float): log-likelihood of the mixture.
+    """
+    xi = np.empty(V.shape, dtype=V.dtype)
+
+    def shard(start, stop):
+        Rxs, Rss, xi[:, start:stop], loglik = _expectation(Rx[start:stop], A, V[:, start:stop], noise)
+        return Rxs, Rss, loglik
+
+    parts = map_shards(shard, shard_bounds(Rx.shape[0], threads), threads)
+    Rxs, Rss, loglik = [sum(part[k] for part in parts) for k in range(3)]
+    return Rxs, Rss, xi, loglik
+
+
+def _expectation(Rx, A, V, noise):
+    """ E-step on a shard of frequency bins: Rxs, Rss and loglik being its partial sums (see expectation). """
+    I, J = A.shape
+    Vt = V.transpose(1, 2, 0)
+
+    # Mixture covariance predicted by the model, and its inverse
+    Sigma_x = np.einsum('fnj,ij,kj->fnik', Vt, A, A) + float(noise) * np.eye(I, dtype=V.dtype)
+    Sigma_inv = np.linalg.inv(Sigma_x)
+
+    # Wiener gains G = V A^T Sigma_x^-1
+    G = Vt[..., None] * np.einsum('ij,fnik->fnjk', A, Sigma_inv)
+
+    # Posterior statistics
+    GRx = G @ Rx
+    Rss_fn = (GRx @ G.swapaxes(-1, -2)).real
+    Rss_fn -= (G @ A) * Vt[..., None, :]
+    Rss_fn[..., np.arange(J), np.arange(J)] += Vt
+    Rxs = GRx.sum(axis=(0, 1)).real.T
+    Rss = Rss_fn.sum(axis=(0, 1))
+    xi = np.maximum(Rss_fn[..., np.arange(J), np.arange(J)], eps).transpose(2, 0, 1)
+
+    _, logdet = np.linalg.slogdet(Sigma_x)
+    trace = np.einsum('fnik,fnki->fn', Sigma_inv, Rx).real
+    # Summed in double precision, its improvements being tested by converged
+    loglik = -np.sum(logdet + trace + I * np.log(np.pi), dtype=float)
+
+    return Rxs, Rss, xi, loglik
+
+
+def update_mixing_matrix(A, Rxs, Rss, free):
+    """
+    M-step for the instantaneous mixing matrix, fixed columns being kept.
+    Args:
+        - A (I, J): current mixing matrix.
+        - Rxs (I, J), Rss (J, J): sufficient statistics from the E-step.
+        - free (J,) bool: adaptability of each column.
+    """
+    if not free.any():
+        return A
+    A = A.copy()
+    fixed = ~free
+    target = Rxs[:, free] - A[:, fixed] @ Rss[np.ix_(fixed, free)]
+    A[:, free] = target @ np.linalg.inv(Rss[np.ix_(free, free)])
+    return A
+
+
+def update_spectral_parameters(source, xi, threads=1):
+    """
+    Multiplicative updates of the free excitation parameters of a source,
+    for the Itakura-Saito divergence between xi and the product of factors.
+    With threads > 1, the rows of the first factor (Wex, one per frequency
+    bin) are split into shards: the updates of Wex are computed shard by
+    shard, those of the other factors summed over the shards.
+    Args:
+        - source (dict): source as built in template.py, updated in place.
+        - xi (nbin, N): posterior power of the source.
+        - threads (int): number of frequency shards processed at once.
+    """
+    params = factors(source)
+    nbin = xi.shape[0]
+    bounds = shard_bounds(nbin, threads if isinstance(params[0]['data'], np.ndarray) else 1)
+    for l, param in enumerate(params):
+        if param['adaptability'] != 'free':
+            continue
+        mats = [p['data'] for p in params]
+        right = chain(mats[l + 1:])
+
+        def shard(start, stop):
+            rows = mats if stop - start == nbin else [mats[0][start:stop]] + mats[1:]
+            V = np.maximum(np.asarray(chain(rows)), eps)
+            num = xi[start:stop] / V ** 2
+            den = 1 / V
+            if l > 0:
+                left = chain(rows[:l])
+                num, den = left.T @ num, left.T @ den
+            return num, den
+
+        parts = map_shards(shard, bounds, threads)
+        if l == 0:
+            num, den = [np.concatenate([part[k] for part in parts]) for k in range(2)]
+        else:
+            num, den = [sum(part[k] for part in parts) for k in range(2)]
+        if right is not None:
+            num, den = num @ right.T, den @ right.T
+
+        # Entries without any contribution to V (e.g. Gex columns facing an
+        # empty row of a Toeplitz Hex) have num = den = 0 up to the roundoff
+        # of the FFT products: they are left unchanged instead of amplified.
+        param['data'] = param['data'] * (np.maximum(num, 0) + eps) / (np.maximum(den, 0) + eps)
+
+
+def normalize_mixing(sources, A):
+    """
+    Store the columns of A with unit norm in the sources, the norm being
+    moved into the first free excitation parameter.
+    Args:
+        - sources (list of dict): sources, updated in place.
+        - A (I, J): mixing matrix.
+    """
+    for j, source in enumerate(sources):
+        a = A[:, j]
+        norm = np.linalg.norm(a)
+        free = [p for p in factors(source) if p['adaptability'] == 'free']
+        if free and norm > 0:
+            free[0]['data'] = free[0]['data'] * norm ** 2
+            a = a / norm
+        source['A']['data'] = np.reshape(a, np.shape(source['A']['data']))
+
+
+def noise_floor(Rx):
+    """ Default variance of the noise floor of the model: a small fraction of the mixture power. """
+    return float(1e-6 * np.mean(np.einsum('fnii->fn', Rx).real)) + eps
+
+
+def log_likelihood(sources, Rx, noise=None, threads=1):
+    """
+    Log-likelihood of the mixture covariance under the model of the sources.
+    Args:
+        - sources (list of dict): sources as built in template.py.
+        - Rx (nbin, N, I, I): mixture covariance.
+        - noise (float): variance of the noise floor of the model.
+        - threads (int): number of frequency shards processed at once.
+    """
+    if noise is None:
+        noise = noise_floor(Rx)
+    V = np.stack([source_power(s) for s in sources])
+    return expectation(Rx, mixing_matrix(sources), V, noise, threads)[3]
+
+
+def converged(loglik, tol, size):
+    """
+    Convergence test of EM: True when the last improvement of the
+    log-likelihood, per time-frequency point, is below tol. Unlike the
+    log-likelihood itself, its improvements do not depend on the scale of
+    the mixture.
+    Args:
+        - loglik (list of float): log-likelihood at each iteration (or check).
+        - tol (float): tolerance, None never converges.
+        - size (int): number of time-frequency points, nbin * N.
+    """
+    return tol is not None and len(loglik) > 1 and (loglik[-1] - loglik[-2]) / size < tol
+
+
+def estimate_source_parameters(sources, Rx, iterations, noise=None, tol=None, threads=1):
+    """
+    EM estimation of the source parameters.
+    Args:
+        - sources (list of dict): initial sources as built in template.py.
+        - Rx (nbin, N, I, I): mixture covariance.
+        - iterations (int): maximum number of EM iterations.
+        - noise (float): variance of the noise floor of the model, default
+          to noise_floor(Rx).
+        - tol (float): stop when the improvement of the log-likelihood per
+          time-frequency point falls below tol, None to run all the iterations.
+        - threads (int): number of frequency shards of the E-step and of the
+          spectral updates processed at once.
+    Returns:
+        - sources (list of dict): estimated sources.
+        - loglik (list of float): log-likelihood at each iteration.
+    """
+    sources = [copy_source(s) for s in sources]
+    if noise is None:
+        noise = noise_floor(Rx)
+
+    free = np.array([s['A']['adaptability'] == 'free' for s in sources])
+    loglik = []
+    for it in range(int(iterations)):
+        A = mixing_matrix(sources)
+        V = np.stack([source_power(s) for s in sources])
+
+        Rxs, Rss, xi, L = expectation(Rx, A, V, noise, threads)
+        loglik.append(L)
+        if converged(loglik, tol, Rx.shape[0] * Rx.shape[1]):
+            break
+
+        A = update_mixing_matrix(A, Rxs, Rss, free)
+        for j, source in enumerate(sources):
+            update_spectral_parameters(source, xi[j], threads)
+        normalize_mixing(sources, A)
+
+    return sources, loglik
+
+
+def decimate_covariance(Rx, factor):
+    """
+    Mixture covariance at a coarser time resolution: mean of Rx over groups
+    of factor consecutive frames.
+    Args:
+        - Rx (nbin, N, I, I): mixture covariance.
+        - factor (int): decimation factor.
+    Returns:
+        - Rx (nbin, ceil(N/factor), I, I)
+    """
+    N = Rx.shape[1]
+    starts = np.arange(0, N, factor)
+    counts = np.diff(np.append(starts, N)).astype(Rx.real.dtype)
+    return np.add.reduceat(Rx, starts, axis=1) / counts[:, None, None]
+
+
+def _resample_axis(data, size, axis):
+    """ Linear interpolation of data to size samples along axis. """
+    n = data.shape[axis]
+    if n == size:
+        return data
+    x = np.clip((np.arange(size) + .5) * n / size - .5, 0, n - 1)
+    i = np.minimum(np.floor(x).astype(int), max(n - 2, 0))
+    shape = [1] * data.ndim
+    shape[axis] = size
+    w = (x - i).astype(data.dtype).reshape(shape)
+    return (1 - w) * np.take(data, i, axis) + w * np.take(data, np.minimum(i + 1, n - 1), axis)
+
+
+def resample_source(source, target):
+    """
+    Carry the parameters of a source to another time resolution.
+    Free parameters are interpolated along the axes whose length differs in
+    target (e.g. N and M = 2N for Hex), fixed ones are taken from target,
+    and the first free factor is rescaled so that the mean spectral power
+    is unchanged.
+    Args:
+        - source (dict): estimated source.
+        - target (dict): the same source built at the new resolution.
+    Returns:
+        - source (dict): copy of target with the parameters of source.
+    """
+    resampled = copy_source(target)
+    resampled['A']['data'] = np.array(source['A']['data'])
+    free = [p for p in ex_params if p in target and target[p]['adaptability'] != 'fixed']
+    for p in free:
+        data = np.asarray(source[p]['data'])
+        for axis, size in enumerate(target[p]['data'].shape):
+            data = _resample_axis(data, size, axis)
+        resampled[p]['data'] = data
+
+    if free:
+        ratio = float(np.mean(source_power(source))) / max(float(np.mean(source_power(resampled))), eps)
+        resampled[free[0]]['data'] = resampled[free[0]]['data'] * ratio
+    return resampled
+
+
+def multiresolution_schedule(iterations, levels, fine=0.1):
+    """
+    Coarse-to-fine EM schedule: levels coarse levels with decimation factors
+    2**levels, ..., 2 share the iterations, but a fraction fine of them
+    which run at full resolution.
+    Returns:
+        - schedule (list of (int, int)): decimation factor and maximum number
+          of iterations of each level.
+    """
+    full = max(1, int(round(iterations * fine))) if levels else int(iterations)
+    coarse = int(iterations) - full
+    schedule = [(2 ** l, coarse // levels + (k < coarse % levels))
+                for k, l in enumerate(range(levels, 0, -1))]
+    return [(f, n) for f, n in schedule if n > 0] + [(1, full)]
+
+
+def estimate_multiresolution(sources, build, Rx, schedule, noise=None, tol=None, threads=1):
+    """
+    Coarse-to-fine EM: the sources are first estimated on time-decimated
+    frames, the cost of an iteration being proportional to the number of
+    frames, then carried to the next level (resample_source) and refined.
+    Args:
+        - sources (list of dict): initial sources at full resolution.
+        - build (callable): build(N, nbin, decimation) returns the sources
+          built from the templates for N frames of decimation STFT frames.
+        - Rx (nbin, N, I, I): mixture covariance.
+        - schedule (list of (int, int)): decimation factor and maximum number
+          of iterations of each level, e.g. from multiresolution_schedule.
+        - noise (float): variance of the noise floor of the model.
+        - tol (float): convergence tolerance of each level.
+        - threads (int): number of frequency shards processed at once.
+    Returns:
+        - sources (list of dict): estimated sources at full resolution.
+        - loglik (list of float): log-likelihood at each iteration.
+        - decimation (list of int): decimation factor of each iteration.
+    """
+    nbin, N = Rx.shape[:2]
+    if noise is None:
+        noise = noise_floor(Rx)
+
+    loglik, decimation = [], []
+    estimated = sources
+    for factor, iterations in schedule:
+        if factor > 1:
+            targets = build(-(-N // factor), nbin, decimation=factor)
+            Rx_level = decimate_covariance(Rx, factor)
+        else:
+            targets, Rx_level = sources, Rx
+        level = [resample_source(s, t) for s, t in zip(estimated, targets)]
+        estimated, L = estimate_source_parameters(level, Rx_level, iterations, noise, tol, threads)
+        loglik += L
+        decimation += [factor] * len(L)
+    return estimated, loglik, decimation
+
+
+wiener_defaults = {'a': 0., 'b': 0., 'c1': 0, 'c2': 0, 'd': float('-inf')}
+
+
+def moving_average(v, width, axis):
+    """ Mean of v over the 2 width + 1 neighbours along axis, truncated at the edges. """
+    width = int(width)
+    if width <= 0:
+        return v
+    n = v.shape[axis]
+    v = np.moveaxis(v, axis, -1)
+    c = np.concatenate([np.zeros(v.shape[:-1] + (1,), dtype=v.dtype), np.cumsum(v, axis=-1)], axis=-1)
+    hi = np.minimum(np.arange(n) + width + 1, n)
+    lo = np.maximum(np.arange(n) - width, 0)
+    return np.moveaxis((c[..., hi] - c[..., lo]) / (hi - lo).astype(v.dtype), -1, axis)
+
+
+def wiener_parameters(sources):
+    """ Wiener filter parameters of each source, template.py defaults for the missing ones. """
+    return [dict(wiener_defaults, **s.get('wiener', {})) for s in sources]
+
+
+def wiener_filter(X, sources, noise=None, chunk=64, threads=1):
+    """
+    Multichannel Wiener filtering of the mixture, all sources at once,
+    honoring the 'wiener' parameters of each source (as FASST):
+    * c1, c2 : half-widths in frames and bins of the smoothing of the source
+      variances (separable moving averages over the STFT grid),
+    * a : over-subtraction in dB, the covariance of the other sources and of
+      the noise being weighted by 10^(a/10) in the filter of the source,
+    * b : phase weighting in [0, 1], the phase of the estimate moving from
+      its Wiener phase (b = 0) to the phase of the mixture (b = 1),
+    * d : threshold in dB (<= 0), time-frequency points where the power of
+      the estimate is below d dB of the power of the mixture are set to 0.
+    The filters are computed chunk frequency bins at a time, in the
+    precision of X, threads chunks being processed in parallel.
+    Args:
+        - X (nbin, N, I): STFT of the mixture.
+        - sources (list of dict): estimated sources.
+        - noise (float): variance of the noise floor of the model.
+        - chunk (int): number of frequency bins of a chunk.
+        - threads (int): number of chunks processed at once.
+    Returns:
+        - Y (J, nbin, N, I): STFT of the spatial image of each source.
+    """
+    nbin, N, I = X.shape
+    J = len(sources)
+    if noise is None:
+        noise = float(1e-6 * np.mean(np.abs(X) ** 2) * I) + eps
+    params = wiener_parameters(sources)
+
+    A = mixing_matrix(sources)
+    V = np.stack([moving_average(moving_average(source_power(s), p['c2'], 0), p['c1'], 1)
+                  for s, p in zip(sources, params)])
+    gain = np.array([10 ** (p['a'] / 10) for p in params], dtype=V.dtype)
+    b = np.array([p['b'] for p in params], dtype=V.dtype)
+    d = np.array([p['d'] for p in params], dtype=V.dtype)
+    AA = np.einsum('ij,kj->jik', A, A)                                # (J, I, I)
+
+    Y = np.empty((J, nbin, N, I), dtype=X.dtype)
+
+    def shard(f0, f1):
+        Xc = X[f0:f1]
+        S = V[:, f0:f1, :, None, None] * AA[:, None, None]            # (J, F, N, I, I)
+        Sigma_x = float(noise) * np.eye(I, dtype=V.dtype) + S.sum(axis=0)
+        if np.all(gain == 1):
+            # Same mixture covariance in the filters of all the sources
+            SiX = np.einsum('fnik,fnk->fni', np.linalg.inv(Sigma_x), Xc)
+            proj = np.einsum('ij,fni->jfn', A, SiX)
+        else:
+            Sigma = S + gain[:, None, None, None, None] * (Sigma_x - S)
+            SiX = np.einsum('jfnik,fnk->jfni', np.linalg.inv(Sigma), Xc)
+            proj = np.einsum('ij,jfni->jfn', A, SiX)
+        Yc = (V[:, f0:f1] * proj)[..., None] * A.T[:, None, None, :]
+
+        if np.any(b > 0):
+            phase = (1 - b[:, None, None, None]) * np.angle(Yc) + b[:, None, None, None] * np.angle(Xc)
+            Yc = np.abs(Yc) * np.exp(1j * phase)
+        if np.any(d > -np.inf):
+            with np.errstate(divide='ignore'):
+                ratio = 10 * np.log10(np.sum(np.abs(Yc) ** 2, axis=-1)
+                                      / (np.sum(np.abs(Xc) ** 2, axis=-1) + eps))
+            Yc[ratio < d[:, None, None]] = 0
+        Y[:, f0:f1] = Yc
+
+    map_shards(shard, [(f, min(f + chunk, nbin)) for f in range(0, nbin, chunk)], threads)
+    return Y
+
+
+def estimate_sources(X, sources, noise=None, threads=1):
+    """
+    Multichannel Wiener filtering of the mixture (wiener_filter).
+    Args:
+        - X (nbin, N, I): STFT of the mixture.
+        - sources (list of dict): estimated sources.
+        - noise (float): variance of the noise floor of the model.
+        - threads (int): number of frequency chunks processed at once.
+    Yields:
+        - Y (nbin, N, I): STFT of the spatial image of each source.
+    """
+    for Y in wiener_filter(X, sources, noise, threads=threads):
+        yield Y
+
+
+def reconstruct(X, sources, wlen, nbSamples, noise=None, chunk=64, threads=1):
+    """
+    Spatial images of the sources: Wiener filtering (wiener_filter) and
+    inverse STFT of all the sources at once.
+    Returns:
+        - y (J, nbSamples, I): spatial image of each source.
+    """
+    Y = wiener_filter(X, sources, noise, chunk, threads)
+    J, nbin, N, I = Y.shape
+    y = istft(Y.transpose(1, 2, 0, 3).reshape(nbin, N, J * I), wlen, nbSamples)
+    return y.reshape(nbSamples, J, I).transpose(1, 0, 2)
+
+
+def copy_source(source):
+    """ Copy of a source dict whose parameters can be updated safely. """
+    source = dict(source)
+    for key in ['A'] + ex_params:
+        if key in source:
+            source[key] = dict(source[key])
+    return source
+
+
+def separate(mixture_wavname, sources, wlen, iterations, results_dir, cache_dir=None, tol=None,
+             build=None, levels=0, profiler=None, dtype=np.float64, threads=1):
+    """
+    Run all the separation stages in-process and write the estimated sources.
+    Args:
+        - mixture_wavname (str): path to the mixtures .wav file.
+        - sources (list of dict): initial sources as built in template.py.
+        - wlen (int): STFT window length.
+        - iterations (int): maximum number of EM iterations.
+        - results_dir (str): directory of the <name>.wav estimated sources.
+        - cache_dir (str): cache directory of the mixture statistics, None to disable it.
+        - tol (float): log-likelihood improvement per time-frequency point below which EM stops.
+        - build (callable): build(N, nbin, decimation) builds the sources from
+          the templates, needed by the multiresolution EM.
+        - levels (int): number of coarse levels of the multiresolution EM
+          (multiresolution_schedule), 0 to run all the iterations at full resolution.
+        - profiler (profiling.Profiler): instrumentation of the covariance, em
+          and reconstruction stages.
+        - dtype (dtype): precision of the mixture statistics, that of the
+          sources being given by the templates (see template.astype).
+        - threads (int): number of frequency shards of the EM and Wiener
+          filter processed at once.
+    Returns:
+        - sources (list of dict): estimated sources.
+        - loglik (list of float): log-likelihood at each iteration.
+        - decimation (list of int): decimation factor of each iteration.
+    """
+    print('>> Input time-frequency representation')
+    with profiling.stage(profiler, 'covariance') as record:
+        X, Rx, sr_hz, nbSamples = mixture_statistics(mixture_wavname, wlen, cache_dir, dtype=dtype)
+        record['arrays'].update(X=profiling.array_size(X), Rx=profiling.array_size(Rx))
+
+    print('>> Refinement of sources models (EM algorithm)')
+    with profiling.stage(profiler, 'em') as record:
+        if levels:
+            schedule = multiresolution_schedule(iterations, levels)
+            print('>>> Coarse-to-fine schedule (decimation, iterations): %s' % schedule)
+            sources, loglik, decimation = estimate_multiresolution(sources, build, Rx, schedule, tol=tol, threads=threads)
+        else:
+            sources, loglik = estimate_source_parameters(sources, Rx, iterations, tol=tol, threads=threads)
+            decimation = [1] * len(loglik)
+        record['arrays'].update(profiling.source_sizes(sources))
+        record['iterations'] = len(loglik)
+    del Rx
+    if loglik:
+        print('>>> %d iterations, log-likelihood %g' % (len(loglik), loglik[-1]))
+
+    print('>> Computation of estimated sources')
+    with profiling.stage(profiler, 'reconstruction'):
+        for source, y in zip(sources, reconstruct(X, sources, wlen, nbSamples, threads=threads)):
+            audio.write(os.path.join(results_dir, source['name'] + '.wav'), y, sr_hz)
+
+    return sources, loglik, decimation
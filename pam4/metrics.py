@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+#
+# BSS Eval separation quality metrics (SDR, SIR, SAR, as in the bss_eval
+# toolbox of E. Vincent, version 3, with time-invariant distortion filters
+# of filter_length taps), framewise and vectorized:
+# * the lagged correlations of the references and estimates are computed
+#   with FFTs (scipy.fft, multi-threaded) instead of explicit lags,
+# * all the frames, channels and (reference, estimate) pairs of a batch are
+#   projected at once, the least-squares systems being solved by a batched
+#   np.linalg.solve (multi-threaded BLAS),
+# * the results directories are scored in a pool of worker processes, the
+#   frames per batch and the number of processes being derived from a
+#   memory budget if one is given (plan).
+# Multichannel signals are projected channel by channel, the energies of the
+# distortion components being summed over the channels.
+#
+###########################################################################
+
+import os
+import re
+import glob
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import audio
+
+filter_length = 512 # taps of the allowed distortion filters
+window = 1.         # frame length in seconds, None for whole signals
+
+def frame(x, win, hop):
+    """
+    Split signals into frames, the last incomplete frame being dropped.
+    Args:
+        - x (..., T): signals.
+        - win, hop (int): frame length and hop in samples, None for one frame.
+    Returns:
+        - frames (nframes, ..., win)
+    """
+    T = x.shape[-1]
+    if win is None or win >= T:
+        return x[None]
+    starts = np.arange(0, T - win + 1, hop or win)
+    return np.stack([x[..., t:t + win] for t in starts])
+
+def _projections(S, E, L, workers):
+    """
+    Least-squares projections of the estimates on the subspace spanned by the
+    references delayed by 0..L-1 samples.
+    Args:
+        - S (B, J, T): references, B being frames x channels.
+        - E (B, K, T): estimates.
+        - L (int): filter length.
+        - workers (int): FFT threads.
+    Returns:
+        - P_all (B, K, T + L - 1): projection of each estimate on all the references.
+        - P_own (B, J, K, T + L - 1): projection of each estimate on each reference.
+    """
+    import scipy.fft
+
+    B, J, T = S.shape
+    K = E.shape[1]
+    nfft = scipy.fft.next_fast_len(T + L - 1, real=True)
+    Sf = scipy.fft.rfft(S, nfft, axis=-1, workers=workers)
+    Ef = scipy.fft.rfft(E, nfft, axis=-1, workers=workers)
+
+    # corr[b, i, j, tau] = sum_t s_j(t + tau) s_i(t)
+    corr = scipy.fft.irfft(Sf[:, None, :, :] * Sf[:, :, None, :].conj(), nfft, axis=-1, workers=workers)
+    lags = (np.arange(L)[:, None] - np.arange(L)[None, :]) % nfft
+    # G[b, (i, a), (j, c)] = sum_t s_i(t - a) s_j(t - c) = corr[b, i, j, a - c]
+    G = corr[..., lags]                                              # (B, J, J, L, L)
+    G = G.transpose(0, 1, 3, 2, 4)                                   # (B, J, L, J, L)
+    # D[b, (i, a), k] = sum_t s_i(t - a) e_k(t)
+    D = scipy.fft.irfft(Ef[:, None, :, :] * Sf[:, :, None, :].conj(), nfft, axis=-1,
+                        workers=workers)[..., :L]                    # (B, J, K, L)
+    D = D.transpose(0, 1, 3, 2)                                      # (B, J, L, K)
+
+    # Diagonal loading, relative to the energy of the references
+    load = 1e-10 * np.maximum(np.einsum('bjaja->b', G), 1e-20)[:, None, None] / (J * L)
+    eye = np.eye(L)
+
+    C_all = np.linalg.solve(G.reshape(B, J * L, J * L) + load * np.eye(J * L), D.reshape(B, J * L, K))
+    C_all = C_all.reshape(B, J, L, K)
+    G_own = np.stack([G[:, j, :, j, :] for j in range(J)], axis=1)   # (B, J, L, L)
+    C_own = np.linalg.solve(G_own + load[:, None] * eye, D)          # (B, J, L, K)
+
+    Cf_all = scipy.fft.rfft(C_all, nfft, axis=2, workers=workers)    # (B, J, F, K)
+    Cf_own = scipy.fft.rfft(C_own, nfft, axis=2, workers=workers)
+    P_all = scipy.fft.irfft(np.einsum('bjf,bjfk->bkf', Sf, Cf_all), nfft, axis=-1, workers=workers)
+    P_own = scipy.fft.irfft(Sf[:, :, None, :] * Cf_own.transpose(0, 1, 3, 2), nfft, axis=-1, workers=workers)
+    return P_all[..., :T + L - 1], P_own[..., :T + L - 1]
+
+def _energies(references, estimates, L, workers):
+    """
+    Energies of the BSS Eval components of every (reference, estimate) pair.
+    Args:
+        - references (nframes, C, J, T), estimates (nframes, C, K, T)
+    Returns:
+        - target, interference, artifacts (nframes, J, K): energies of
+          s_target, e_interf and e_artif summed over the channels.
+        - silent (nframes, J): frames where the reference is zero.
+    """
+    nframes, C, J, T = references.shape
+    K = estimates.shape[2]
+    S = references.reshape(nframes * C, J, T)
+    E = estimates.reshape(nframes * C, K, T)
+    P_all, P_own = _projections(S, E, L, workers)
+    E = np.concatenate([E, np.zeros(E.shape[:2] + (L - 1,))], axis=-1)
+
+    target = np.sum(P_own ** 2, axis=-1)
+    interference = np.sum((P_all[:, None] - P_own) ** 2, axis=-1)
+    artifacts = np.sum((E - P_all) ** 2, axis=-1)[:, None, :].repeat(J, axis=1)
+    shape = (nframes, C, J, K)
+    silent = np.all(references == 0, axis=(1, 3))
+    return (target.reshape(shape).sum(1), interference.reshape(shape).sum(1),
+            artifacts.reshape(shape).sum(1), silent)
+
+def frame_memory(J, C, L, win):
+    """
+    Estimated peak memory in bytes of the projections of one frame: the
+    Gram matrices of (J L)^2 floats of each channel are built, reordered,
+    loaded and factorized (about 4 copies), beside the lagged correlations.
+    Args:
+        - J (int): number of sources.
+        - C (int): number of channels.
+        - L (int): length of the distortion filters.
+        - win (int): frame length in samples.
+    """
+    return 8 * C * (4 * (J * L) ** 2 + 2 * J * J * (win + L))
+
+def plan(memory, J, C, L, win, count):
+    """
+    Number of frames projected at once and number of processes fitting a
+    memory budget, as many directories as possible being scored at the same
+    time (up to the number of cores), the rest of the budget going to the
+    batches.
+    Args:
+        - memory (float): memory budget in bytes, shared by the processes.
+        - J, C, L, win (int): see frame_memory.
+        - count (int): number of directories to score.
+    Returns:
+        - batch (int): frames per batch, at least 1.
+        - processes (int): number of processes, at least 1.
+    """
+    per_frame = frame_memory(J, C, L, win)
+    processes = int(max(1, min(count, os.cpu_count(), memory // per_frame)))
+    batch = int(max(1, memory // processes // per_frame))
+    return batch, processes
+
+def _db(num, den):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 10 * np.log10(np.maximum(num, 1e-40) / np.maximum(den, 1e-40))
+
+def bss_eval(references, estimates, win=None, hop=None, L=filter_length, batch=16,
+             permutation=False, workers=-1):
+    """
+    Framewise SDR, SIR and SAR of the estimated sources.
+    Args:
+        - references (J, T) or (J, T, C): reference sources (or images).
+        - estimates (K, T) or (K, T, C): estimated sources, K = J, truncated
+          or zero-padded to the length of the references.
+        - win, hop (int): frame length and hop in samples, None for whole signals.
+        - L (int): length of the distortion filters.
+        - batch (int): number of frames projected at once, which bounds the
+          memory (batch * C Gram matrices of (J L)^2 floats).
+        - permutation (bool): match the estimates to the references by
+          maximizing the mean SIR, otherwise estimate j is scored against reference j.
+        - workers (int): FFT threads, -1 for all the cores.
+    Returns:
+        - sdr, sir, sar (J, nframes): metrics in dB, NaN where the reference is silent.
+        - perm (J,): estimate matched with each reference.
+    """
+    references = np.asarray(references, dtype=np.float64)
+    estimates = np.asarray(estimates, dtype=np.float64)
+    if references.ndim == 2:
+        references = references[..., None]
+    if estimates.ndim == 2:
+        estimates = estimates[..., None]
+    J, T, C = references.shape
+    if estimates.shape[0] != J or estimates.shape[2] != C:
+        raise ValueError('Expected %d estimates of %d channels, got %s' % (J, C, estimates.shape))
+    if estimates.shape[1] < T:
+        estimates = np.concatenate([estimates, np.zeros((J, T - estimates.shape[1], C))], axis=1)
+    estimates = estimates[:, :T]
+
+    # (nframes, C, J, T) frames of the references and estimates
+    references = frame(references.transpose(2, 0, 1), win, hop)
+    estimates = frame(estimates.transpose(2, 0, 1), win, hop)
+    nframes = len(references)
+
+    parts = [_energies(references[f:f + batch], estimates[f:f + batch], L, workers)
+             for f in range(0, nframes, batch)]
+    target, interference, artifacts, silent = [np.concatenate(p) for p in zip(*parts)]
+
+    sdr = _db(target, interference + artifacts)                      # (nframes, J, K)
+    sir = _db(target, interference)
+    sar = _db(target + interference, artifacts)
+    for m in (sdr, sir, sar):
+        m[silent] = np.nan
+
+    if permutation:
+        from scipy.optimize import linear_sum_assignment
+        with np.errstate(invalid='ignore'):
+            score = np.nan_to_num(np.nanmean(sir, axis=0), nan=-np.inf)
+        perm = linear_sum_assignment(-np.maximum(score, -1e10))[1]
+    else:
+        perm = np.arange(J)
+    pick = lambda m: m[:, np.arange(J), perm].T
+    return pick(sdr), pick(sir), pick(sar), perm
+
+def source_index(fname):
+    """ Sort key of the source files: the leading index of the name (e.g. 10_EstimatedSource.wav). """
+    name = os.path.basename(fname)
+    match = re.search(r'\d+', name)
+    return (int(match.group()) if match else -1, name)
+
+def list_sources(dirname):
+    """ .wav files of a directory, sorted by source index. """
+    return sorted(glob.glob(os.path.join(dirname, '*.wav')), key=source_index)
+
+def load(fnames):
+    """ Load .wav files as (J, T, C) signals, truncated to the shortest one. """
+    signals = [audio.read(fname)[0] for fname in fnames]
+    T = min(len(x) for x in signals)
+    return np.stack([x[:T] for x in signals])
+
+def score(reference_files, estimate_files, win=None, hop=None, L=filter_length, permutation=False, workers=-1,
+          batch=16):
+    """
+    Score estimated source files against reference files.
+    When the references and estimates have different numbers of channels
+    (e.g. mono sources and stereo images), the channels are averaged.
+    The other arguments are those of bss_eval.
+    Returns:
+        - scores (dict): framewise and median SDR, SIR, SAR of each reference file.
+    """
+    if len(estimate_files) != len(reference_files):
+        raise ValueError('Expected %d estimated sources, got %d' % (len(reference_files), len(estimate_files)))
+    references, estimates = load(reference_files), load(estimate_files)
+    if references.shape[2] != estimates.shape[2]:
+        references = references.mean(axis=2, keepdims=True)
+        estimates = estimates.mean(axis=2, keepdims=True)
+    sdr, sir, sar, perm = bss_eval(references, estimates, win, hop, L, batch, permutation, workers)
+    scores = []
+    for j, fname in enumerate(reference_files):
+        entry = {'reference': fname, 'estimate': estimate_files[perm[j]]}
+        for name, m in (('sdr', sdr[j]), ('sir', sir[j]), ('sar', sar[j])):
+            entry[name] = float(np.nanmedian(m)) if np.any(np.isfinite(m)) else None
+            entry[name + '_frames'] = [None if np.isnan(v) else float(v) for v in m]
+        scores.append(entry)
+    return scores
+
+def _score_directory(reference_files, results_dir, win, hop, L, permutation, workers, batch):
+    return score(reference_files, list_sources(results_dir), win, hop, L, permutation, workers, batch)
+
+def main(references, results_dirs, output=None, window=window, L=filter_length,
+         permutation=False, processes=None, batch=None, memory=None):
+    """
+    Score the estimated sources of results directories, in parallel.
+    Args:
+        - references (str): directory of the reference .wav files (one per source).
+        - results_dirs (list of str): directories of estimated sources, e.g.
+          the results/ of the workspaces of batch.py.
+        - output (str): .json file of the scores.
+        - window (float): frame length in seconds, None for whole signals.
+        - L (int): length of the distortion filters.
+        - permutation (bool): match the estimates to the references.
+        - processes (int): number of directories scored at the same time,
+          default to the number of cores or as given by memory.
+        - batch (int): number of frames projected at once by each process,
+          default to 16 or as given by memory.
+        - memory (float): memory budget in MB of the projections of all the
+          processes, from which the defaults of batch and processes are
+          derived (see plan).
+    Returns:
+        - scores (dict): scores of each results directory.
+    """
+    reference_files = list_sources(references)
+    wav = audio.WavFile(reference_files[0])
+    win = None if window is None else int(window * wav.sample_rate)
+    if memory is not None:
+        J, C = len(reference_files), wav.nb_channels
+        budget = memory * 2 ** 20
+        if processes:
+            budget /= processes
+        planned_batch, planned_processes = plan(budget, J, C, L, min(win or wav.nb_samples, wav.nb_samples),
+                                                1 if processes else len(results_dirs))
+        batch = batch or planned_batch
+        processes = processes or planned_processes
+    batch = batch or 16
+    processes = processes or min(len(results_dirs), os.cpu_count())
+    # The FFT threads of the processes share the cores
+    workers = max(1, os.cpu_count() // processes)
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_score_directory, reference_files, d, win, win, L, permutation, workers, batch)
+                   for d in results_dirs]
+        scores = {d: future.result() for d, future in zip(results_dirs, futures)}
+
+    for d, entries in scores.items():
+        print('> %s' % d)
+        for entry in entries:
+            print('  %-28s SDR %6.2f  SIR %6.2f  SAR %6.2f' % (
+                os.path.basename(entry['estimate']),
+                *[np.nan if entry[m] is None else entry[m] for m in ('sdr', 'sir', 'sar')]))
+    if output is not None:
+        with open(output, 'w') as f:
+            json.dump({'references': reference_files, 'window': window, 'filter_length': L,
+                       'results': scores}, f, indent=2)
+    return scores
+
+#%% main call
+def cli():
+    """ Command line entry point: python metrics.py, or python -m pam4.metrics. """
+    parser = argparse.ArgumentParser(description='BSS Eval metrics (SDR, SIR, SAR) of estimated sources.')
+
+    parser.add_argument('references',
+                        type=str, help='Directory of the reference sources wave files.')
+
+    parser.add_argument('results', nargs='+',
+                        type=str, help='Directories of the estimated sources wave files.')
+
+    parser.add_argument('-o', '--output', default=None,
+                        type=str, help='Scores .json file.', dest='output')
+
+    parser.add_argument('-win', '--window', default=window,
+                        type=float, help='Frame length in seconds (0 for whole signals).', dest='window')
+
+    parser.add_argument('-L', '--filter_length', default=filter_length,
+                        type=int, help='Length of the distortion filters.', dest='L')
+
+    parser.add_argument('-perm', '--permutation', action='store_true',
+                        help='Match the estimates to the references.', dest='permutation')
+
+    parser.add_argument('-P', '--processes', default=None,
+                        type=int, help='Number of directories scored at the same time.', dest='processes')
+
+    parser.add_argument('-batch', default=None,
+                        type=int, help='Number of frames projected at once by each process (default: 16).', dest='batch')
+
+    parser.add_argument('-mem', '--memory', default=None,
+                        type=float, help='Memory budget in MB from which the batch and the number of processes are derived.', dest='memory')
+
+    options = parser.parse_args()
+    main(options.references, options.results, options.output, options.window or None,
+         options.L, options.permutation, options.processes, options.batch, options.memory)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,263 @@
+import os
+import argparse
+import torch
+import torch.nn as nn
+
+from . import audio
+from . import utils
+
+filename = 'audios/mix.wav'
+nb_seconds = 3
+nb_epoch = 200
+
+#%%
+def train(model, mixtures, optimizer, criterion, epoch):
+    model.train()
+    y = torch.t(model(torch.t(mixtures)))
+    # compute loss
+    loss = criterion(y)
+    # backward
+    optimizer.zero_grad()
+    loss.backward()
+    optimizer.step()
+    return loss
+
+def batch(filename, nb_seconds, nb_epoch):
+    """ Full-batch training of the separation matrix on the first seconds of a file. """
+    x, sample_rate = utils.load(filename)
+    x = x[:, :sample_rate * nb_seconds]
+
+    nb_mixtures, T = x.size()
+    nb_sources = nb_mixtures
+
+    B = nn.Linear(nb_mixtures, nb_sources, bias=False)
+    estim_function = utils.H(utils.edgeworth, nb_sources)
+
+    #%% optimization definition
+    model = B
+    criterion = utils.estimation_equation(nb_sources, estim_function)
+    optimizer = torch.optim.Adam(model.parameters(), lr=2e-3, weight_decay=1e-5)
+
+    for epoch in range(nb_epoch):
+        loss = train(model, x, optimizer, criterion, epoch)
+        print(loss)
+    return model
+
+#%% streaming training
+def train_stream(filename, window=16384, batch_size=16, nb_steps=10000, lr=2e-3,
+                 checkpoint='temp/online.pt', checkpoint_every=500):
+    """ Mini-batch training of the separation matrix over the whole file.
+    Shuffled windows are streamed from the file (utils.windows), the next
+    mini-batch being read by a background thread while the current step
+    runs, so the cost of a step does not depend on the length of the file.
+    The separation matrix and the optimizer state are checkpointed with
+    the file they are trained on, and training resumes from the checkpoint
+    when it exists; a checkpoint of another file or number of channels is
+    refused.
+    Args:
+        - filename (str): path to the mixtures .wav file.
+        - window (int): number of samples per window.
+        - batch_size (int): number of windows per step.
+        - nb_steps (int): total number of steps.
+        - lr (float): learning rate of Adam.
+        - checkpoint (str): checkpoint file, None to disable checkpoints.
+        - checkpoint_every (int): number of steps between checkpoints.
+    """
+    nb_mixtures, sample_rate, T = utils.info(filename)
+    nb_sources = nb_mixtures
+
+    model = nn.Linear(nb_mixtures, nb_sources, bias=False)
+    criterion = utils.estimation_equation(nb_sources, utils.H(utils.edgeworth, nb_sources))
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr, weight_decay=1e-5)
+
+    step = 0
+    filename = os.path.abspath(filename)
+    if checkpoint is not None and os.path.exists(checkpoint):
+        state = torch.load(checkpoint)
+        trained = (state.get('filename'), state.get('nb_mixtures'))
+        if trained != (filename, nb_mixtures):
+            raise ValueError('Checkpoint %s was trained on %s (%s channels), not on %s (%d channels): '
+                             'remove it or choose another checkpoint' % ((checkpoint,) + trained + (filename, nb_mixtures)))
+        model.load_state_dict(state['B'])
+        optimizer.load_state_dict(state['optimizer'])
+        step = state['step']
+        print('Resuming from %s at step %d' % (checkpoint, step))
+
+    def save():
+        os.makedirs(os.path.dirname(checkpoint) or '.', exist_ok=True)
+        torch.save({'step': step, 'B': model.state_dict(), 'optimizer': optimizer.state_dict(),
+                    'filename': filename, 'nb_mixtures': nb_mixtures}, checkpoint + '.tmp')
+        os.replace(checkpoint + '.tmp', checkpoint)
+
+    model.train()
+    batches = utils.prefetch(utils.windows(filename, window, batch_size, seed=step))
+    for mixtures in batches:
+        if step >= nb_steps:
+            break
+        y = model(mixtures.transpose(-1, -2)).transpose(-1, -2)
+        loss = criterion(y)
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        step += 1
+
+        if checkpoint is not None and step % checkpoint_every == 0:
+            save()
+            print('step %d, loss %f' % (step, loss.item()))
+    batches.close()
+
+    if checkpoint is not None:
+        save()
+    return model
+
+#%% online separation
+class RingBuffer(object):
+    """ Fixed capacity FIFO of multichannel samples.
+    Args:
+        - n (int): number of channels.
+        - capacity (int): maximum number of buffered samples.
+    """
+    def __init__(self, n, capacity):
+        self.data = torch.zeros(n, capacity)
+        self.capacity = capacity
+        self.start = 0
+        self.size = 0
+
+    def free(self):
+        return self.capacity - self.size
+
+    def push(self, x):
+        """ Append the samples x (n, m), m <= free(). """
+        m = x.size(1)
+        if m > self.free():
+            raise ValueError('RingBuffer overflow: %d samples pushed, %d free' % (m, self.free()))
+        index = (self.start + self.size + torch.arange(m)) % self.capacity
+        self.data[:, index] = x.to(self.data.dtype)
+        self.size += m
+
+    def pop(self, m):
+        """ Remove and return the m (<= size) oldest samples. """
+        index = (self.start + torch.arange(m)) % self.capacity
+        x = self.data[:, index]
+        self.start = (self.start + m) % self.capacity
+        self.size -= m
+        return x
+
+def easi_update(B, y, k, learning_rate):
+    """ Normalized EASI update of the separation matrix from one block.
+    Args:
+        - B (n, n): separation matrix.
+        - y (n, L): block of separated sources, y = B x.
+        - k (n,): kurtosis estimate of the sources, used to select the
+          nonlinearity g(y) = -k y^3 (as BSS.phi_o).
+        - learning_rate (float): EASI step per sample, the step of the block
+          being L times larger so that the adaptation speed (in samples)
+          does not depend on the block size.
+    """
+    n, L = y.size()
+    step = learning_rate * L
+    g = -k.unsqueeze(-1) * y ** 3
+    Cyy = y @ y.t() / L
+    Cgy = g @ y.t() / L
+    H = (Cyy - torch.eye(n)) / (1 + step * torch.trace(Cyy)) \
+        + (Cgy - Cgy.t()) / (1 + step * torch.abs(torch.trace(Cgy)))
+    return B - step * H @ B
+
+def easi(source, n, block_size=1024, learning_rate=1e-4, smoothing=0.9, capacity=None):
+    """ Online adaptive separation (EASI) of a stream of mixtures.
+    Input chunks of any size go through a ring buffer, from which fixed-size
+    blocks are separated with the current matrix B, which is then updated
+    from the block. Memory and per-block latency do not depend on the
+    length of the stream.
+    Args:
+        - source (iterable): chunks (n, m) of mixtures, e.g. utils.stream(filename)
+          or a live capture generator.
+        - n (int): number of channels (and of sources).
+        - block_size (int): number of samples per separated block.
+        - learning_rate (float): EASI step per sample (see easi_update).
+        - smoothing (float): forgetting factor of the running kurtosis estimate.
+        - capacity (int): ring buffer capacity, at least one block, default to 4 blocks.
+    Yields:
+        - y (n, block_size): separated block, the last one may be shorter.
+        - B (n, n): separation matrix after the update from this block.
+    """
+    capacity = capacity or 4 * block_size
+    if capacity < block_size:
+        raise ValueError('RingBuffer capacity %d is smaller than a block of %d samples' % (capacity, block_size))
+    buffer = RingBuffer(n, capacity)
+    B = torch.eye(n)
+    k = None
+    with torch.no_grad():
+        for chunk in source:
+            chunk = torch.as_tensor(chunk, dtype=torch.float32)
+            while chunk.size(1) > 0:
+                m = min(chunk.size(1), buffer.free())
+                buffer.push(chunk[:, :m])
+                chunk = chunk[:, m:]
+                while buffer.size >= block_size:
+                    y = B @ buffer.pop(block_size)
+                    k_block = utils.kurto(y)
+                    k = k_block if k is None else smoothing * k + (1 - smoothing) * k_block
+                    B = easi_update(B, y, k, learning_rate)
+                    yield y, B
+        if buffer.size > 0:
+            yield B @ buffer.pop(buffer.size), B
+
+def online(filename, output, block_size, learning_rate):
+    """ Separate a .wav file with easi, writing the sources to an int16 .wav file as they are
+    produced. EASI drives the sources to unit variance: they are peak normalized (audio.WavWriter). """
+    n, sample_rate, T = utils.info(filename)
+    with audio.WavWriter(output, sample_rate, n, normalize=True) as writer:
+        for y, B in easi(utils.stream(filename, block_size), n, block_size, learning_rate):
+            writer.write(y.t().numpy())
+    print(B)
+    return B
+
+#%% main call
+def cli():
+    """ Command line entry point: python online.py, or python -m pam4.online. """
+    parser = argparse.ArgumentParser(description='Blind source separation by relative gradient.')
+
+    parser.add_argument('filename', nargs='?', default=filename,
+                        type=str, help='Mixtures wave file.')
+
+    parser.add_argument('-m', '--mode', default='batch', choices=['batch', 'stream', 'easi'],
+                        help="Full-batch training on the first seconds, mini-batch training over the whole file, or online EASI separation of the whole file.", dest='mode')
+
+    parser.add_argument('-epoch', '--nb_epoch', default=nb_epoch,
+                        type=int, help="Number of epochs (batch mode).", dest='epoch')
+
+    parser.add_argument('-sec', '--nb_seconds', default=nb_seconds,
+                        type=int, help="Number of seconds used for training (batch mode).", dest='seconds')
+
+    parser.add_argument('-o', '--output', default='results/online.wav',
+                        type=str, help="Separated sources wave file (easi mode).", dest='output')
+
+    parser.add_argument('-bs', '--block_size', default=1024,
+                        type=int, help="Number of samples per block (easi mode) or window (stream mode).", dest='block_size')
+
+    parser.add_argument('-lr', '--learning_rate', default=1e-4,
+                        type=float, help="EASI step per sample (easi mode).", dest='lr')
+
+    parser.add_argument('-steps', '--nb_steps', default=10000,
+                        type=int, help="Number of training steps (stream mode).", dest='steps')
+
+    parser.add_argument('-bw', '--batch_windows', default=16,
+                        type=int, help="Number of windows per mini-batch (stream mode).", dest='batch_windows')
+
+    parser.add_argument('-ckpt', '--checkpoint', default='temp/online.pt',
+                        type=str, help="Checkpoint of the separation matrix and optimizer (stream mode).", dest='checkpoint')
+
+    options = parser.parse_args()
+
+    if options.mode == 'batch':
+        batch(options.filename, options.seconds, options.epoch)
+    elif options.mode == 'stream':
+        model = train_stream(options.filename, options.block_size, options.batch_windows,
+                             options.steps, checkpoint=options.checkpoint)
+        print(model.weight)
+    else:
+        online(options.filename, options.output, options.block_size, options.lr)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,152 @@
+import numpy as np
+
+def H_attack_decay(M, N, decay=0.01):
+    """ Requirement: M < N.
+    Args:
+        - M (int): note length.
+        - N (int): number of frames.
+        - decay (float): exponential decay time
+    """
+    H = np.zeros((M, N))
+
+    for n in range(N):
+        # Dirac pattern
+        H[M-1-n, N-1-n] = 1
+
+        # exponential decay
+        H[: N-1-n, N-1-n] = np.flip(np.exp(- decay * np.arange(N-1-n)))
+
+    return H
+
+class Toeplitz(object):
+    """
+    Implicit Toeplitz matrix T[r, c] = kernel[r - c + cols - 1], applied as an
+    FFT convolution so that it is never materialized.
+    Attributes:
+        - kernel (rows + cols - 1,): diagonals of the matrix, from the last
+          column's first row to the first column's last row.
+        - shape (tuple): (rows, cols).
+    """
+    # Let numpy defer `ndarray @ Toeplitz` to __rmatmul__
+    __array_ufunc__ = None
+
+    ndim = 2
+
+    def __init__(self, kernel, shape):
+        rows, cols = shape
+        if len(kernel) != rows + cols - 1:
+            raise ValueError('kernel of length %d does not match shape %s'
+                             % (len(kernel), (rows, cols)))
+        self.kernel = np.asarray(kernel)
+        self.shape = (rows, cols)
+        self._spectra = {}
+        self._supports = {}
+
+    @property
+    def dtype(self):
+        return self.kernel.dtype
+
+    @property
+    def nbytes(self):
+        return self.kernel.nbytes
+
+    @property
+    def T(self):
+        return Toeplitz(self.kernel[::-1], self.shape[::-1])
+
+    def astype(self, dtype, copy=True):
+        """ Same operator with the kernel (and FFT products) in the precision of dtype. """
+        if not copy and self.kernel.dtype == dtype:
+            return self
+        return Toeplitz(self.kernel.astype(dtype), self.shape)
+
+    def _spectrum(self, nfft, reverse):
+        key = (nfft, reverse)
+        if key not in self._spectra:
+            kernel = self.kernel[::-1] if reverse else self.kernel
+            self._spectra[key] = np.fft.rfft(kernel, nfft)
+        return self._spectra[key]
+
+    def _convolve(self, x, reverse, start, count):
+        """ Slice [start, start+count) of the full convolution of the rows of x with the kernel. """
+        nfft = 1 << int(np.ceil(np.log2(x.shape[-1] + len(self.kernel) - 1)))
+        y = np.fft.irfft(np.fft.rfft(x, nfft) * self._spectrum(nfft, reverse), nfft)
+        return y[..., start:start + count]
+
+    def _support(self, length, count):
+        """ Whether each of the count windows kernel[i:i+length] (reversed
+        order for the columns) holds a nonzero entry. """
+        key = (length, count)
+        if key not in self._supports:
+            nonzero = np.concatenate(([0], np.cumsum(self.kernel != 0)))
+            self._supports[key] = nonzero[length:length + count] > nonzero[:count]
+        return self._supports[key]
+
+    def __matmul__(self, Z):
+        """ T @ Z, with Z of shape (cols,) or (cols, K). """
+        rows, cols = self.shape
+        Z = np.asarray(Z)
+        Y = self._convolve(Z.T, False, cols - 1, rows).T
+        # Rows of T without nonzero entries give exact zeros, not FFT roundoff
+        return Y * self._support(cols, rows).reshape((rows,) + (1,) * (Y.ndim - 1))
+
+    def __rmatmul__(self, X):
+        """ X @ T, with X of shape (rows,) or (K, rows). """
+        rows, cols = self.shape
+        Y = self._convolve(np.asarray(X), True, rows - 1, cols)
+        # Column c of T is the window kernel[cols-1-c : cols-1-c+rows]
+        return Y * self._support(rows, cols)[::-1]
+
+    def columns(self, start, stop):
+        """ Dense block T[:, start:stop]. """
+        rows, cols = self.shape
+        index = np.arange(rows)[:, None] + (cols - 1 - np.arange(start, stop))[None, :]
+        return self.kernel[index]
+
+    def toarray(self):
+        return self.columns(0, self.shape[1])
+
+    def __array__(self, dtype=None, copy=None):
+        return self.toarray() if dtype is None else self.toarray().astype(dtype)
+
+    def __getstate__(self):
+        return {'kernel': self.kernel, 'shape': self.shape}
+
+    def __setstate__(self, state):
+        self.__init__(state['kernel'], state['shape'])
+
+    def __repr__(self):
+        return 'Toeplitz(shape=%s, dtype=%s)' % (self.shape, self.dtype)
+
+def H_attack_decay_op(M, N, decay=0.01):
+    """ Same matrix as H_attack_decay, as an implicit Toeplitz operator.
+    Requirement: M >= N.
+    Args:
+        - M (int): note length.
+        - N (int): number of frames.
+        - decay (float): exponential decay time
+    """
+    if M < N:
+        raise ValueError('H_attack_decay_op requires M >= N, got M=%d, N=%d' % (M, N))
+    # Diagonals r - c from -(N-1) to M-1: exponential decay above the main
+    # diagonal, Dirac pattern on the (M-N)-th subdiagonal.
+    kernel = np.zeros(M + N - 1)
+    kernel[:N - 1] = np.exp(- decay * np.arange(N - 1))[::-1]
+    kernel[M - 1] = 1
+    return Toeplitz(kernel, (M, N))
+
+def G_HMM(K, M):
+    """
+    Args:
+        - K (int):
+    """
+    return None
+
+#%% main call
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+    plt.imshow(H_attack_decay(180, 80))
+    plt.title("H_ex for non-sustained sources")
+    plt.xlabel("Note length")
+    plt.ylabel("Number of frames")
+    plt.show()
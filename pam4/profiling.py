@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+#
+# Stage-level instrumentation of the separation: each stage (template
+# construction, XML write, mixture covariance, EM, source reconstruction...)
+# records its wall time, CPU time (of this process and of the child
+# processes, e.g. the FASST binaries), peak RSS and the sizes of its largest
+# arrays. The records are streamed to an optional callback as each stage
+# ends, and written to a JSON report.
+#
+# The peak RSS of a stage is the high-water mark of the process, reset at the
+# beginning of the stage through /proc/self/clear_refs where the kernel
+# supports it (Linux), otherwise the peak since the start of the process.
+#
+###########################################################################
+
+import os
+import sys
+import json
+import time
+import contextlib
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+def _reset_peak_rss():
+    """ Reset the high-water mark of the RSS of the process, returns False if not supported. """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _status(field):
+    """ Value in bytes of a kB field of /proc/self/status, None if not available. """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def peak_rss():
+    """ Peak resident set size of the process in bytes. """
+    peak = _status('VmHWM')
+    if peak is None and resource is not None:
+        # ru_maxrss is in kB on Linux, in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return peak
+
+def array_size(array):
+    """ Shape, dtype and bytes of an array (or of an object with shape, dtype and nbytes, as patterns.Toeplitz). """
+    return {'shape': list(array.shape), 'dtype': str(array.dtype), 'nbytes': int(array.nbytes)}
+
+def source_sizes(sources):
+    """ Sizes of the parameters of the sources, keyed by '<source name>.<parameter>'. """
+    sizes = {}
+    for source in sources:
+        for param, value in source.items():
+            if isinstance(value, dict) and hasattr(value.get('data'), 'nbytes'):
+                sizes['%s.%s' % (source['name'], param)] = array_size(value['data'])
+    return sizes
+
+class Profiler(object):
+    """
+    Records of the stages of a run.
+    Args:
+        - callback (callable): called with the record (dict) of each stage when it ends.
+    Attributes:
+        - stages (list of dict): records of the stages, in order.
+    """
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.stages = []
+        self.start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Instrument the stage run in the with block. The record is yielded so
+        that the block can add the sizes of its arrays to record['arrays'] or
+        other information.
+        """
+        record = {'name': name, 'start': time.perf_counter() - self.start, 'arrays': {}}
+        reset = _reset_peak_rss()
+        times = os.times()
+        wall = time.perf_counter()
+        try:
+            yield record
+        finally:
+            end = os.times()
+            record['wall_time'] = time.perf_counter() - wall
+            record['cpu_time'] = (end.user - times.user) + (end.system - times.system)
+            record['children_cpu_time'] = ((end.children_user - times.children_user)
+                                           + (end.children_system - times.children_system))
+            record['peak_rss'] = peak_rss()
+            record['peak_rss_scope'] = 'stage' if reset else 'process'
+            record['rss'] = _status('VmRSS')
+            self.stages.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    def report(self, fname=None, **info):
+        """
+        Report of the run: the stage records and info, also written to fname
+        if given.
+        """
+        report = dict(info, wall_time=time.perf_counter() - self.start, stages=self.stages)
+        if fname is not None:
+            with open(fname, 'w') as f:
+                json.dump(report, f, indent=2)
+        return report
+
+def stage(profiler, name):
+    """ profiler.stage(name), or a context yielding a throwaway record if profiler is None. """
+    if profiler is None:
+        return contextlib.nullcontext({'arrays': {}})
+    return profiler.stage(name)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+#
+# Source reconstruction only: the sources estimated by a previous run
+# (temp/sources.xml.new, written by the fasst backend, or by the numpy one
+# with --write_xml) are Wiener filtered from the cached STFT of the mixture
+# (engine.mixture_statistics) and written to the results directory. The Wiener parameters of the sources (a, b, c1, c2,
+# d, see engine.wiener_filter) can be overridden, so that the reconstruction
+# can be tuned without rerunning EM.
+#
+###########################################################################
+
+import os
+import time
+import argparse
+
+import numpy as np
+
+from . import audio
+from . import engine
+from . import XMLReader
+
+def main(filename, xml_fname, results_dir, cache_dir=None, wiener=None, names=None, chunk=64,
+         dtype=np.float64, threads=1):
+    """
+    Reconstruct the sources of a previous run.
+    Args:
+        - filename (str): path to the mixtures .wav file.
+        - xml_fname (str): estimated sources, e.g. temp/sources.xml.new.
+        - results_dir (str): directory of the <name>.wav estimated sources.
+        - cache_dir (str): cache directory of the mixture statistics, None to
+          compute the STFT of the mixture only.
+        - wiener (dict): Wiener parameters overriding the ones of the sources.
+        - names (list of str): sources whose Wiener parameters are overridden,
+          default to all of them.
+        - chunk (int): number of frequency bins filtered at once.
+        - dtype (dtype or str): precision of the sources and of the filtering.
+        - threads (int): number of chunks filtered in parallel.
+    Returns:
+        - sources (list of dict): sources with their Wiener parameters.
+    """
+    data = XMLReader.loadXML(xml_fname, dtype=dtype)
+    sources = data['sources']
+    for params, source in zip(engine.wiener_parameters(sources), sources):
+        if wiener and (names is None or source['name'] in names):
+            params.update(wiener)
+        source['wiener'] = params
+
+    start = time.time()
+    if cache_dir is None:
+        # The STFT only, the mixture covariance is not needed by the filter
+        x, sr_hz = audio.read(filename, dtype)
+        X, nbSamples = engine.stft(x, data['wlen']), len(x)
+        del x
+    else:
+        # Memory-mapped, Rx is not read (only computed to fill a missing entry)
+        X, _, sr_hz, nbSamples = engine.mixture_statistics(filename, data['wlen'], cache_dir, dtype=dtype)
+    os.makedirs(results_dir, exist_ok=True)
+    for source, y in zip(sources, engine.reconstruct(X, sources, data['wlen'], nbSamples, chunk=chunk,
+                                                                    threads=threads)):
+        audio.write(os.path.join(results_dir, source['name'] + '.wav'), y, sr_hz)
+        print('>> %s: %s' % (source['name'], source['wiener']))
+    print('> %d sources reconstructed in %.2f s' % (len(sources), time.time() - start))
+    return sources
+
+#%% main call
+def cli():
+    """ Command line entry point: python reconstruct.py, or python -m pam4.reconstruct. """
+    parser = argparse.ArgumentParser(description='Wiener reconstruction of previously estimated sources.')
+
+    # Default files of separate.py, in the root of the repository (parent of the pam4 package)
+    script_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    parser.add_argument('filename',
+                        type=str, help='Mixtures wave file.')
+
+    parser.add_argument('-xml', default=os.path.join(script_path, 'temp/sources.xml.new'),
+                        type=str, help='Estimated sources of a previous run.', dest='xml')
+
+    parser.add_argument('-o', '--output', default=os.path.join(script_path, 'results/'),
+                        type=str, help='Directory of the estimated sources.', dest='output')
+
+    parser.add_argument('-cache', '--cache_dir', default=os.path.join(script_path, 'temp/cache/'),
+                        type=str, help='Cache directory of the mixture time-frequency representation.', dest='cache_dir')
+    parser.add_argument('--no_cache', action='store_false',
+                        help='Compute the STFT of the mixture only, without reading nor filling the cache.', dest='cache')
+
+    parser.add_argument('-a', default=None, type=float,
+                        help="Over-subtraction in dB.", dest='a')
+    parser.add_argument('-b', default=None, type=float,
+                        help="Phase weighting, between 0 (Wiener phase) and 1 (mixture phase).", dest='b')
+    parser.add_argument('-c1', default=None, type=int,
+                        help="Half-width in frames of the smoothing of the source variances.", dest='c1')
+    parser.add_argument('-c2', default=None, type=int,
+                        help="Half-width in frequency bins of the smoothing of the source variances.", dest='c2')
+    parser.add_argument('-d', default=None, type=float,
+                        help="Threshold in dB (<= 0) of the power of the sources relative to the mixture.", dest='d')
+
+    parser.add_argument('-sources', default=None, nargs='+',
+                        type=str, help='Names of the sources whose Wiener parameters are overridden (default: all).', dest='names')
+
+    parser.add_argument('-dtype', default='float64', choices=['float64', 'float32'],
+                        help='Precision of the sources and of the Wiener filtering.', dest='dtype')
+    parser.add_argument('-threads', default=1, type=int,
+                        help='Number of frequency chunks filtered in parallel.', dest='threads')
+
+    options = parser.parse_args()
+    wiener = {k: getattr(options, k) for k in engine.wiener_defaults if getattr(options, k) is not None}
+    main(options.filename, options.xml, options.output, options.cache_dir if options.cache else None, wiener, options.names,
+         dtype=options.dtype, threads=options.threads)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+#
+# Segmented separation of long mixtures:
+# * the mixture is cut into overlapping segments, separated independently by
+#   the in-process engine in a pool of worker processes,
+# * the identity of the sources is kept across segments by matching the
+#   spatial A vectors of consecutive segments,
+# * each estimated source is reassembled by crossfaded overlap-add.
+#
+###########################################################################
+
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from . import audio
+from . import engine
+
+
+def segment_bounds(nbSamples, length, hop):
+    """
+    Boundaries of the overlapping segments covering a signal.
+    Args:
+        - nbSamples (int): length of the signal.
+        - length (int): segment length in samples.
+        - hop (int): hop between segment starts in samples, <= length.
+    Returns:
+        - bounds (list of (int, int)): [start, stop) of each segment.
+    """
+    if not 0 < hop <= length:
+        raise ValueError('Segment hop must be in (0, length], got hop=%d, length=%d' % (hop, length))
+    bounds = []
+    start = 0
+    while True:
+        stop = min(start + length, nbSamples)
+        bounds.append((start, stop))
+        if stop == nbSamples:
+            return bounds
+        start += hop
+
+
+def crossfade_weights(bounds, k):
+    """
+    Overlap-add weights of the k-th segment: sine-squared fade in over the
+    overlap with the previous segment, fade out over the next one.
+    """
+    start, stop = bounds[k]
+    w = np.ones(stop - start)
+    if k > 0:
+        overlap = bounds[k - 1][1] - start
+        w[:overlap] *= np.sin((np.arange(overlap) + .5) / overlap * np.pi / 2) ** 2
+    if k < len(bounds) - 1:
+        overlap = stop - bounds[k + 1][0]
+        w[len(w) - overlap:] *= np.cos((np.arange(overlap) + .5) / overlap * np.pi / 2) ** 2
+    return w
+
+
+def match_sources(A_ref, A):
+    """
+    Permutation of the sources of a segment that best matches the spatial
+    directions of the reference segment.
+    Args:
+        - A_ref (I, J): mixing matrix of the reference segment.
+        - A (I, J): mixing matrix of the segment.
+    Returns:
+        - perm (J,): A[:, perm] matches A_ref.
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    A_ref = A_ref / np.maximum(np.linalg.norm(A_ref, axis=0), engine.eps)
+    A = A / np.maximum(np.linalg.norm(A, axis=0), engine.eps)
+    perm = linear_sum_assignment(-np.abs(A_ref.T @ A))[1]
+    return perm
+
+
+def separate_segment(job):
+    """
+    Worker: in-process separation of one segment.
+    Args:
+        - job (tuple): (x, build, wlen, iterations, tol, seed, threads) with x
+          the segment samples and build(N, nbin) the function building the
+          sources, the precision of the separation being that of x.
+    Returns:
+        - names (list of str): names of the sources.
+        - A (I, J): estimated mixing matrix.
+        - images (J, nbSamples, I): spatial images of the sources.
+    """
+    x, build, wlen, iterations, tol, seed, threads = job
+    np.random.seed(seed)
+
+    X = engine.stft(x, wlen)
+    sources = build(X.shape[1], X.shape[0])
+    sources = engine.estimate_source_parameters(
+        sources, engine.compute_mixture_covariance_matrix(X), iterations, tol=tol, threads=threads)[0]
+
+    images = np.stack([engine.istft(Y, wlen, len(x)) for Y in engine.estimate_sources(X, sources, threads=threads)])
+    return [s['name'] for s in sources], engine.mixing_matrix(sources), images
+
+
+def separate_segments(mixture_wavname, build, wlen, iterations, results_dir,
+                      length, hop, workers=1, tol=None, dtype=np.float64, threads=1):
+    """
+    Segmented separation of a mixture, segments being processed in parallel.
+    Args:
+        - mixture_wavname (str): path to the mixtures .wav file.
+        - build (callable): build(N, nbin) returns the initial sources of a
+          segment of N frames. Must be picklable.
+        - wlen (int): STFT window length.
+        - iterations (int): maximum number of EM iterations per segment.
+        - results_dir (str): directory of the <name>.wav estimated sources.
+        - length (float): segment length in seconds.
+        - hop (float): hop between segments in seconds.
+        - workers (int): number of worker processes.
+        - tol (float): log-likelihood improvement per time-frequency point below which EM stops.
+        - dtype (dtype): precision of the segments, matching that of the sources built by build.
+        - threads (int): number of frequency shards processed at once by each worker.
+    """
+    x, sr_hz = audio.read(mixture_wavname, dtype)
+    bounds = segment_bounds(len(x), int(length * sr_hz), int(hop * sr_hz))
+    seeds = np.random.randint(2**31, size=len(bounds))
+    jobs = ((x[start:stop], build, wlen, iterations, tol, seed, threads)
+            for (start, stop), seed in zip(bounds, seeds))
+
+    print('>> Separation of %d segments with %d workers' % (len(bounds), workers))
+    y, names, A_ref = None, None, None
+    norm = np.zeros(len(x), dtype=x.dtype)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for k, (seg_names, A, images) in enumerate(pool.map(separate_segment, jobs)):
+            if y is None:
+                names, A_ref = seg_names, A
+                y = np.zeros((len(names),) + x.shape, dtype=x.dtype)
+            perm = match_sources(A_ref, A)
+            A_ref = A[:, perm]
+
+            start, stop = bounds[k]
+            w = crossfade_weights(bounds, k)
+            y[:, start:stop] += images[perm] * w[:, None]
+            norm[start:stop] += w
+
+    y /= np.maximum(norm, engine.eps)[:, None]
+    for name, image in zip(names, y):
+        audio.write(os.path.join(results_dir, name + '.wav'), image, sr_hz)
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+#
+# Parameters used to initialize FASST in this example:
+# * Mixture type : instantaneous.
+# * Time-Frequency representation : STFT with 1024 frequency bins.
+# * Source paramater Wex : Normally distributed random matrix (default init).
+# * Source paramater Hex : Normally distributed random matrix (default init).
+# * Source paramater A : balanced gains (left, middle, right)
+# * Source paramater adaptability : free, all previous parameters are updated during the iterative EM process.
+# * Number of EM iterations : 200
+#
+###########################################################################
+# Copyright 2018 Ewen Camberlein (INRIA), Romain Lebarbenchon (INRIA)
+# This software is distributed under the terms of the GNU Public License
+# version 3 (http://www.gnu.org/licenses/gpl.txt)
+###########################################################################
+
+from __future__ import division
+import numpy as np
+import os, sys
+from . import template
+from . import audio
+from . import engine
+from . import XMLWriter
+from . import segmentation
+from . import profiling
+import shutil
+import json
+import argparse
+from functools import partial
+
+backends = ['fasst', 'numpy']
+dtypes = ['float64', 'float32']
+
+transformType     = 'STFT'  # Time-frequency transform
+wlen              = 1024    # Window length in samples (frame length in time domain) - should be multiple of 4 for STFT
+
+def pan_vector(J, pans):
+    """ Pans of the J sources, the sources without a given pan being centered. """
+    pans = np.asarray(pans, dtype=float)
+    return np.pad(pans, (0, max(0, J - len(pans))))
+
+def build_sources(J, nb_voice, nb_guitar, nb_piano, nb_trump, nb_sax, nb_drum, pans, N, nbin, decimation=1,
+                  dtype=np.float64):
+    """
+    Initial sources of the audio scene, from the templates.
+    Args:
+        - J (int): number of sources to estimate.
+        - nb_voice, ..., nb_drum (int): number of tracks of each instrument,
+          remaining sources use the default template.
+        - pans (J,): panoramic of each source.
+        - N (int): number of frames.
+        - nbin (int): number of frequency bins.
+        - decimation (int): number of STFT frames per frame, for the coarse
+          levels of the multiresolution EM (time constants are scaled).
+        - dtype (dtype): precision of the source matrices (template.astype).
+    """
+    sources = []
+    j = 0
+    
+    for i in range(nb_voice):
+        sources.append(template.voice(j, N, nbin, pans[j]))
+        j += 1
+    for i in range(nb_guitar):
+        sources.append(template.guitar(j, N, nbin, pans[j], decay=0.01 * decimation))
+        j += 1
+    for i in range(nb_piano):
+        sources.append(template.piano(j, N, nbin, pans[j], decay=0.01 * decimation))
+        j += 1
+    for i in range(nb_trump):
+        sources.append(template.trumpet(j, N, nbin, pans[j]))
+        j += 1
+    for i in range(nb_sax):
+        sources.append(template.saxophone(j, N, nbin, pans[j]))
+        j += 1
+    for i in range(nb_drum):
+        sources.append(template.drums(j, N, nbin, pans[j]))
+        j += 1
+    for i in range(J - j):
+        sources.append(template.other(j + i, N, nbin, pans[j + i]))    
+    return [template.astype(source, dtype) for source in sources]
+
+def warm_start(sources, xml_fname, names=None, verbose=True):
+    """
+    Initialize sources from the estimated sources of a previous run.
+    A source is reused when the previous file has a source of the same name
+    whose parameters all have the same shapes, its free parameters then
+    replacing the template ones, in the precision of the template ones.
+    Other sources keep their template initialization.
+    The file is streamed with XMLReader.iterSources: the shapes are read from
+    the dim and rows/cols nodes and only the reused free parameters are
+    decoded, fixed ones (e.g. the dense Toeplitz Hex) never are.
+    Args:
+        - sources (list of dict): initial sources as built in template.py,
+          updated in place.
+        - xml_fname (str): previous estimated sources, e.g. temp/sources.xml.new.
+        - names (list of str): names of the sources to reuse, None for all.
+        - verbose (bool): print the initialization of each source.
+    Returns:
+        - reused (list of str): names of the reused sources.
+    """
+    from . import XMLReader
+
+    targets = {source['name']: source for source in sources if names is None or source['name'] in names}
+    reused = []
+    for old in XMLReader.iterSources(xml_fname):
+        source = targets.get(old.get('name'))
+        if source is None or source['name'] in reused:
+            continue
+        keys = [k for k in ['A'] + XMLWriter.ex_params + XMLWriter.ft_params if k in source]
+        if any(k not in old or XMLReader.paramShape(old, k) != np.shape(source[k]['data']) for k in keys):
+            continue
+        for k in keys:
+            if source[k]['adaptability'] != 'fixed':
+                source[k]['data'] = np.array(old[k]['data'], dtype=source[k]['data'].dtype)
+        reused.append(source['name'])
+
+    if verbose:
+        for name in targets:
+            if name in reused:
+                print('>>> %s: initialized from %s' % (name, xml_fname))
+            else:
+                print('>>> %s: template initialization' % name)
+    return [name for name in targets if name in reused]
+
+def fasst_estimate_source_parameters(fasst, FASST_data, xml_fname, tmp_dir, iterations, tol, step, Rx):
+    """
+    FASST EM stage with early stopping: FASST runs step iterations at a
+    time, each round starting from the sources estimated by the previous
+    one, until the improvement of the log-likelihood (computed in-process
+    by engine.log_likelihood) falls below tol (engine.converged) or
+    iterations is reached.
+    Args:
+        - fasst (module): FASST python scripts.
+        - FASST_data (dict): FASST_data structure, its sources are updated.
+        - xml_fname (str): FASST input file, the estimation is written to <xml_fname>.new.
+        - tmp_dir (str): FASST workspace.
+        - iterations (int): maximum number of EM iterations.
+        - tol (float): log-likelihood improvement per time-frequency point below which EM stops.
+        - step (int): number of iterations between two log-likelihood checks.
+        - Rx (nbin, N, I, I): mixture covariance.
+    Returns:
+        - trace (dict): 'iterations' done at each check and the 'loglik' reached.
+    """
+    trace = {'iterations': [], 'loglik': []}
+    done = 0
+    while done < iterations:
+        FASST_data['iterations'] = min(step, iterations - done)
+        XMLWriter.writeXML(xml_fname, FASST_data)
+        fasst.estimate_source_parameters(xml_fname, tmp_dir, xml_fname + '.new')
+        done += FASST_data['iterations']
+        warm_start(FASST_data['sources'], xml_fname + '.new', verbose=False)
+
+        trace['iterations'].append(done)
+        trace['loglik'].append(engine.log_likelihood(FASST_data['sources'], Rx))
+        print('>>> %d iterations, log-likelihood %g' % (done, trace['loglik'][-1]))
+        # improvement per time-frequency point and per iteration of the round
+        if engine.converged(trace['loglik'], tol, Rx.shape[0] * Rx.shape[1] * FASST_data['iterations']):
+            break
+    return trace
+
+def write_trace(results_dir, trace, tol, iterations):
+    """ Write the log-likelihood trace of the EM stage to <results_dir>/loglik.json. """
+    trace = dict(trace, tol=tol, max_iterations=iterations,
+                 early_stop=bool(trace['iterations']) and trace['iterations'][-1] < iterations)
+    with open(os.path.join(results_dir, 'loglik.json'), 'w') as f:
+        json.dump(trace, f, indent=2)
+
+def fasst_mixture_covariance(fasst, mixture_wavname, xml_fname, tmp_dir, wlen, transformType, cache_dir=None):
+    """
+    FASST time-frequency representation stage, cached on disk: the files it
+    writes to tmp_dir are stored in <cache_dir>/fasst_<key>/ (key given by
+    engine.statistics_key) and copied back when the same mixture is
+    separated again with the same transform.
+    Args:
+        - fasst (module): FASST python scripts.
+        - mixture_wavname (str): path to the mixtures .wav file.
+        - xml_fname (str): FASST input file.
+        - tmp_dir (str): FASST workspace.
+        - wlen (int): window length.
+        - transformType (str): time-frequency transform.
+        - cache_dir (str): cache directory, None to disable the cache.
+    """
+    if cache_dir is None:
+        fasst.compute_mixture_covariance_matrix(mixture_wavname, xml_fname, tmp_dir)
+        return
+
+    path = os.path.join(cache_dir, 'fasst_' + engine.statistics_key(mixture_wavname, wlen, transformType))
+    if os.path.isdir(path):
+        print('>>> Reusing %s' % path)
+        for name in os.listdir(path):
+            shutil.copy(os.path.join(path, name), tmp_dir)
+        return
+
+    def stamps():
+        return {name: os.stat(os.path.join(tmp_dir, name)).st_mtime_ns for name in os.listdir(tmp_dir)}
+
+    before = stamps()
+    fasst.compute_mixture_covariance_matrix(mixture_wavname, xml_fname, tmp_dir)
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    os.makedirs(tmp_path, exist_ok=True)
+    for name, stamp in stamps().items():
+        if name != os.path.basename(xml_fname) and before.get(name) != stamp \
+                and os.path.isfile(os.path.join(tmp_dir, name)):
+            shutil.copy(os.path.join(tmp_dir, name), tmp_path)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+def main(filename, J, Niteration_EM,
+         nb_voice, nb_guitar, nb_piano, nb_trump, nb_sax, nb_drum,
+         pan1, pan2, pan3, pan4, pan5, pan6, pan7, pan8, backend='fasst',
+         segment=None, hop=None, workers=1, tmp_dir=None, results_dir=None,
+         cache=True, cache_dir=None, init=None, init_sources=None, tol=1e-3, check=None,
+         levels=0, profile=None, callback=None, dtype=np.float64, threads=1, write_xml=False):
+    """
+    Main function for source separation estimation.
+    Args:
+        - filename (str): path to the mixtures .wav file.
+        - J (int): number of sources to estimate.
+        - Niteration_EM (int): maximum number of iterations of EM algorithm.
+        - nb_voice (int): number of voice tracks in the mixtures.
+        - nb_guitar (int): number of guitare tracks in the mixtures.
+        - nb_piano (int): number of piano tracks in the mixtures.
+        - nb_trump (int): number of trumpet tracks in the mixtures.
+        - nb_sax (int): number of saxophone tracks in the mixtures.
+        - nb_drum (int): number of drums tracks in the mixtures.
+        - pan1-8 (float): panoramic of the j-th source in thr mixtures.
+        - backend (str): 'fasst' to call the FASST binaries, 'numpy' to run
+          the in-process engine (no XML nor FASST installation needed).
+        - segment (float): if given, length in seconds of the overlapping
+          segments separated independently (numpy backend only).
+        - hop (float): hop between segments in seconds, default to half the
+          segment length.
+        - workers (int): number of worker processes for the segments.
+        - tmp_dir (str): workspace for the intermediate files, default to temp/
+          next to this script.
+        - results_dir (str): directory of the estimated sources, default to
+          results/ next to this script.
+        - cache (bool): cache the time-frequency representation and mixture
+          covariance, reused by the runs on the same mixture.
+        - cache_dir (str): cache directory, default to <tmp_dir>/cache/.
+        - init (str): estimated sources of a previous run (e.g.
+          temp/sources.xml.new) used to initialize the matching sources.
+        - init_sources (list of str): names of the sources initialized from
+          init, default to all of them.
+        - tol (float): EM stops when the improvement of the log-likelihood
+          per time-frequency point falls below tol, None to run all the
+          iterations.
+          The log-likelihood trace is written to <results_dir>/loglik.json.
+        - check (int): number of FASST iterations between two
+          log-likelihood checks (fasst backend), None to run FASST once for
+          all the iterations without early stopping. The checks rewrite the
+          XML and compute the mixture covariance in-process, so they are
+          opt-in.
+        - levels (int): number of time-decimated levels of the coarse-to-fine
+          EM (numpy backend), 0 to run EM at full resolution only.
+        - profile (str): JSON report of the wall time, CPU time, peak RSS and
+          array sizes of each stage, default to <results_dir>/profile.json.
+        - callback (callable): called with the record (dict) of each stage
+          when it ends, see profiling.Profiler.
+        - dtype (dtype or str): precision of the templates, mixture statistics,
+          EM and Wiener filtering, 'float32' to halve their memory.
+        - threads (int): number of threads sharing the frequency bins of the
+          EM and Wiener filtering (numpy backend), per worker with segments.
+        - write_xml (bool): write the estimated sources to
+          <tmp_dir>/sources.xml.new (numpy backend, the FASST backend always
+          writes it), e.g. for a later warm start or reconstruct.py. Fixed
+          matrices such as the Toeplitz Hex of the guitar and piano are
+          written dense, so the file grows with the square of the number of
+          frames: this is opt-in.
+
+    """
+    if backend not in backends:
+        raise ValueError("Unknown backend '%s', expected one of %s" % (backend, backends))
+    if segment is not None and backend != 'numpy':
+        raise ValueError("Segmented separation requires the 'numpy' backend")
+    if segment is not None and init is not None:
+        raise ValueError("Warm start is not available for segmented separation")
+    if levels and (backend != 'numpy' or segment is not None):
+        raise ValueError("Multiresolution EM requires the 'numpy' backend without segments")
+    dtype = np.dtype(dtype)
+    if dtype.name not in dtypes:
+        raise ValueError("Unsupported dtype '%s', expected one of %s" % (dtype, dtypes))
+    if threads < 1:
+        raise ValueError("threads must be at least 1, got %d" % threads)
+
+    # ------------------------------------------------------------------------
+    #                      Paths management
+    # ------------------------------------------------------------------------
+
+    # Root of the repository (parent of the pam4 package)
+    script_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print(script_path)
+    
+    # Import the fasst package
+    if backend == 'fasst':
+        fasst_python_dir = '/usr/local/FASST_2.2.2/scripts/python'
+        if fasst_python_dir not in sys.path:
+            sys.path.insert(0, fasst_python_dir)
+        import fasst
+    
+    # Create temp/ and result/ directory if it does not exist
+    if tmp_dir is None:
+        tmp_dir = os.path.join(script_path,'temp/');
+    if not os.path.exists(tmp_dir):
+        os.makedirs(tmp_dir)
+    
+    if results_dir is None:
+        results_dir = os.path.join(script_path, 'results/')
+    if not os.path.exists(results_dir):
+        os.makedirs(results_dir)
+
+    if not cache:
+        cache_dir = None
+    elif cache_dir is None:
+        cache_dir = os.path.join(tmp_dir, 'cache/')
+    if cache_dir is not None and not os.path.exists(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+
+    if profile is None:
+        profile = os.path.join(results_dir, 'profile.json')
+    profiler = profiling.Profiler(callback)
+    info = {'filename': filename, 'backend': backend, 'J': J, 'iterations': Niteration_EM,
+            'dtype': dtype.name, 'threads': threads}
+    
+    # ------------------------------------------------------------------------
+    #                   Mixture and audio scene information
+    # ------------------------------------------------------------------------
+    mixture_wavname = os.path.join(script_path, filename)
+    wav = audio.WavFile(mixture_wavname)
+    
+    
+    # Number of channels
+    I = wav.nb_channels
+    
+    # Number of mixture samples
+    nbSamples_Mix = wav.nb_samples
+    
+    # ------------------------------------------------------------------------
+    #               FASST Initialization (compute input xml file)
+    # ------------------------------------------------------------------------
+    
+    print ('> FASST initialization')
+    
+    # --- FASST general configuration (direct inputs for FASST): module
+    # transformType and wlen
+    
+    # --- Initialization of models and FASST specific parameters for each source
+    
+    # Define necessary parameters
+    N    = int(np.ceil(nbSamples_Mix/wlen*2))  # Number of frames
+    nbin = int(wlen/2 + 1)                     # Number of frequency bins for STFT
+    pans = pan_vector(J, [pan1, pan2, pan3, pan4, pan5, pan6, pan7, pan8])
+    build = partial(build_sources, J, nb_voice, nb_guitar, nb_piano, nb_trump, nb_sax, nb_drum, pans,
+                    dtype=dtype)
+
+    if segment is not None:
+        print ('> Segmented in-process execution')
+        with profiler.stage('segments'):
+            segmentation.separate_segments(mixture_wavname, build, wlen, Niteration_EM, results_dir,
+                                           segment, hop or segment / 2, workers, tol, dtype, threads)
+        profiler.report(profile, **info)
+        return 0
+
+    with profiler.stage('template') as record:
+        sources = build(N, nbin)
+        if init is not None:
+            print ('> Warm start from %s' % init)
+            warm_start(sources, init, init_sources)
+        record['arrays'].update(profiling.source_sizes(sources))
+    
+    # Define FASST_data structure
+    FASST_data = {}
+    FASST_data['tfr_type']   = transformType
+    FASST_data['wlen']       = wlen
+    FASST_data['iterations'] = Niteration_EM
+    FASST_data['sources']    = sources
+    
+    xml_fname = os.path.join(tmp_dir,'sources.xml');
+
+    if backend == 'numpy':
+        print ('> In-process execution')
+        FASST_data['sources'], loglik, decimation = engine.separate(
+            mixture_wavname, sources, wlen, Niteration_EM, results_dir, cache_dir, tol, build, levels,
+            profiler, dtype, threads)
+        write_trace(results_dir, {'iterations': list(range(1, len(loglik) + 1)), 'loglik': loglik,
+                                  'decimation': decimation}, tol, Niteration_EM)
+        # Estimated sources, as written by FASST, e.g. for a later warm start
+        if write_xml:
+            with profiler.stage('xml'):
+                XMLWriter.writeXML(xml_fname + '.new', FASST_data)
+        profiler.report(profile, **info)
+        return 0
+
+    # Write to XML
+    with profiler.stage('xml'):
+        XMLWriter.writeXML(xml_fname, FASST_data)
+    
+    # ------------------------------------------------------------------------
+    #                        Call FASST binaries
+    # ------------------------------------------------------------------------
+    print ('> FASST execution')
+    
+    print ('>> Input time-frequency representation')
+    with profiler.stage('covariance'):
+        fasst_mixture_covariance(fasst, mixture_wavname, xml_fname, tmp_dir, wlen, transformType, cache_dir)
+    
+    print ('>> Refinement of sources models (EM algorithm)')
+    with profiler.stage('em') as record:
+        if tol is None or check is None:
+            fasst.estimate_source_parameters(xml_fname, tmp_dir, xml_fname + '.new')
+        else:
+            Rx = engine.mixture_statistics(mixture_wavname, wlen, cache_dir, transformType, dtype)[1]
+            record['arrays']['Rx'] = profiling.array_size(Rx)
+            trace = fasst_estimate_source_parameters(fasst, FASST_data, xml_fname, tmp_dir,
+                                                     Niteration_EM, tol, check, Rx)
+            del Rx
+            write_trace(results_dir, trace, tol, Niteration_EM)
+            record['iterations'] = trace['iterations'][-1] if trace['iterations'] else 0
+    
+    print ('>> Computation of estimated sources')
+    with profiler.stage('reconstruction'):
+        fasst.estimate_sources(mixture_wavname, xml_fname + '.new',tmp_dir, results_dir)
+    
+    profiler.report(profile, **info)
+    return 0
+
+def add_arguments(parser):
+    """ Add the separation options (all main arguments but filename) to an argparse parser. """
+    parser.add_argument('-J', '--nb_sources', default=2,
+                        type=int, help='Number of sources.', dest='j')
+    
+    parser.add_argument('-epoch', '--nb_epoch', default=200,
+                        type=int, help="Maximum number of iterations of EM algorithm.", dest='epoch')
+
+    parser.add_argument('-tol', default=1e-3, type=float,
+                        help="Log-likelihood improvement per time-frequency point below which EM stops (0 to run all the iterations).", dest='tol')
+    parser.add_argument('-check', default=None, type=int,
+                        help="Number of FASST iterations between two log-likelihood checks, enabling early stopping on the fasst backend (default: a single FASST run).", dest='check')
+    
+    parser.add_argument('-mr', '--multiresolution', default=0, type=int,
+                        help="Number of time-decimated levels of the coarse-to-fine EM (numpy backend).", dest='levels')
+
+    parser.add_argument('-dtype', default='float64', choices=dtypes,
+                        help="Precision of the templates, mixture statistics, EM and Wiener filtering.", dest='dtype')
+    
+    parser.add_argument('-v', '--voice', default=0,
+                        type=int, help="Number of voice tracks in the mixtures.", dest='v')
+    
+    parser.add_argument('-g', '--guitar', default=0,
+                        type=int, help='Number of guitar tracks in the mixtures.', dest='g')
+    
+    parser.add_argument('-p', '--piano', default=0,
+                        type=int, help="Number of piano tracks in the mixtures.", dest='p')
+    
+    parser.add_argument('-t', '--trumpet', default=0,
+                        type=int, help="Number of trumpet tracks in the mixtures.", dest='t')
+    
+    parser.add_argument('-s', '--saxophone', default=0,
+                        type=int, help="Number of saxophone tracks in the mixtures.", dest='s')
+    
+    parser.add_argument('-d', '--drums', default=0,
+                        type=int, help="Number of drum tracks in the mixtures.", dest='d')
+    
+    parser.add_argument('-pan1', default=0, type=float, help="Pan of 1st source.", dest='pan1')
+    parser.add_argument('-pan2', default=0, type=float, help="Pan of 2nd source.", dest='pan2')
+    parser.add_argument('-pan3', default=0, type=float, help="Pan of 3rd source.", dest='pan3')
+    parser.add_argument('-pan4', default=0, type=float, help="Pan of 4th source.", dest='pan4')
+    parser.add_argument('-pan5', default=0, type=float, help="Pan of 5th source.", dest='pan5')
+    parser.add_argument('-pan6', default=0, type=float, help="Pan of 6th source.", dest='pan6')
+    parser.add_argument('-pan7', default=0, type=float, help="Pan of 7th source.", dest='pan7')
+    parser.add_argument('-pan8', default=0, type=float, help="Pan of 8th source.", dest='pan8')
+
+    parser.add_argument('-b', '--backend', default='fasst', choices=backends,
+                        help="Separation engine: FASST binaries or in-process NumPy.", dest='backend')
+
+    parser.add_argument('-seg', '--segment', default=None, type=float,
+                        help="Length in seconds of the overlapping segments separated independently (numpy backend).", dest='segment')
+    parser.add_argument('-hop', default=None, type=float,
+                        help="Hop between segments in seconds (default: half the segment length).", dest='hop')
+    parser.add_argument('-w', '--workers', default=1, type=int,
+                        help="Number of worker processes for the segments.", dest='workers')
+    parser.add_argument('-threads', default=1, type=int,
+                        help="Number of threads sharing the frequency bins of the EM and Wiener filtering (numpy backend).", dest='threads')
+
+    parser.add_argument('-cache', '--cache_dir', default=None, type=str,
+                        help="Cache directory of the mixture time-frequency representation (default: temp/cache/).", dest='cache_dir')
+    parser.add_argument('--no_cache', action='store_false',
+                        help="Always recompute the mixture time-frequency representation.", dest='cache')
+
+    parser.add_argument('-init', default=None, type=str,
+                        help="Estimated sources of a previous run (e.g. temp/sources.xml.new) to start from.", dest='init')
+    parser.add_argument('-profile', default=None, type=str,
+                        help="JSON report of the time and memory of each stage (default: results/profile.json).", dest='profile')
+
+    parser.add_argument('-init_sources', default=None, nargs='+', type=str,
+                        help="Names of the sources initialized from -init (default: all).", dest='init_sources')
+    parser.add_argument('--write_xml', action='store_true',
+                        help="Write the estimated sources to temp/sources.xml.new (numpy backend, always written by fasst).", dest='write_xml')
+
+def run(options, **kwargs):
+    """ Call main with the options parsed by a parser built with add_arguments. """
+    return main(options.filename, options.j, options.epoch,
+                options.v, options.g, options.p, options.t, options.s, options.d,
+                options.pan1, options.pan2, options.pan3, options.pan4,
+                options.pan5, options.pan6, options.pan7, options.pan8,
+                backend=options.backend, segment=options.segment, hop=options.hop,
+                workers=options.workers, cache=options.cache, cache_dir=options.cache_dir,
+                init=options.init, init_sources=options.init_sources,
+                tol=options.tol or None, check=options.check, levels=options.levels,
+                profile=options.profile, dtype=options.dtype, threads=options.threads,
+                write_xml=options.write_xml, **kwargs)
+
+#%% main call
+def cli():
+    """ Command line entry point: python separate.py, or python -m pam4.separate. """
+    parser = argparse.ArgumentParser(description='Informed audio source separation.')
+
+    parser.add_argument('filename', 
+                        type=str, help='Mixtures wave file.')
+    
+    add_arguments(parser)
+    
+    options = parser.parse_args()
+    print(options)
+
+    run(options)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+#
+# Parameter sweep of the informed source separation of one mixture: each
+# point of a grid or random search over the separate.py options (pans,
+# instrument counts, iterations...) is an EM run of the NumPy engine.
+# The mixture statistics are computed once and cached (engine.mixture_statistics),
+# the worker processes memory-map them read-only, so that a point only costs
+# the template initialization and the EM iterations. The points are ranked by
+# final log-likelihood in <output>/sweep.json and <output>/sweep.csv.
+# All the points are run from the same initialization seeds, their
+# log-likelihood being averaged over the seeds, so that they only differ by
+# their options and not by the initialization noise.
+# The log-likelihood does not penalize the model size: it favors more sources
+# (J, instrument counts) and more iterations (epoch, tol). Compare the points
+# with the same number of sources and iterations, or sweep these separately.
+#
+# Search spec (.json file):
+# * "grid": {option: [values]}, all the combinations are run,
+# * "random": {option: {"uniform": [low, high]}, {"loguniform": [low, high]},
+#   {"randint": [low, high]} (high included) or {"choice": [values]}},
+#   "samples" points being drawn for each grid point,
+# * "seed": seed of the random search and first seed of the template initialization,
+# * "seeds": number of initialization seeds (seed, seed + 1, ...) shared by
+#   all the points, 1 by default.
+# Options are the dest names of separate.add_arguments but dtype, the
+# precision of the cached statistics being shared by all the points, e.g.
+#   {"grid": {"v": [0, 1], "epoch": [50, 100]},
+#    "random": {"pan1": {"uniform": [-1, 1]}}, "samples": 10}
+#
+###########################################################################
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import itertools
+import traceback
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from . import engine
+from . import separate
+
+distributions = ['uniform', 'loguniform', 'randint', 'choice']
+
+def draw(rng, distribution):
+    """ Draw a value of an option from its {name: arguments} distribution. """
+    (name, args), = distribution.items()
+    if name == 'uniform':
+        return float(rng.uniform(*args))
+    if name == 'loguniform':
+        return float(np.exp(rng.uniform(np.log(args[0]), np.log(args[1]))))
+    if name == 'randint':
+        return int(rng.integers(args[0], args[1] + 1))
+    if name == 'choice':
+        return args[rng.integers(len(args))]
+    raise ValueError("Unknown distribution '%s', expected one of %s" % (name, distributions))
+
+def list_points(spec, defaults):
+    """
+    List the points of a search spec.
+    Args:
+        - spec (dict): "grid", "random", "samples" and "seed" of the search.
+        - defaults (argparse.Namespace): separate.py options shared by all points.
+    Returns:
+        - points (list of dict): option overrides of each point.
+    """
+    grid = spec.get('grid', {})
+    random = spec.get('random', {})
+    for key in list(grid) + list(random):
+        if not hasattr(defaults, key):
+            raise ValueError("Unknown option '%s' in the search spec" % key)
+        if key == 'dtype':
+            raise ValueError("The precision (dtype) cannot be swept, it is shared by all the points")
+
+    rng = np.random.default_rng(spec.get('seed', 0))
+    samples = spec.get('samples', 1) if random else 1
+    points = []
+    for values in itertools.product(*grid.values()):
+        for i in range(samples):
+            point = dict(zip(grid, values))
+            point.update({key: draw(rng, random[key]) for key in random})
+            points.append(point)
+    return points
+
+# Mixture covariance of the worker process, memory-mapped once by init_worker
+_Rx = None
+
+def init_worker(path):
+    """ Memory-map the cached mixture covariance, read-only, in a worker process. """
+    global _Rx
+    _Rx = np.load(os.path.join(path, 'Rx.npy'), mmap_mode='r')
+
+def run_point(options, seed):
+    """
+    Worker: EM estimation of the source parameters for one point.
+    Args:
+        - options (argparse.Namespace): separate.py options of the point.
+        - seed (int): seed of the template initialization.
+    Returns:
+        - row (dict): final log-likelihood, number of iterations, status and
+          wall time of the point.
+    """
+    row = {'seed': seed}
+    start = time.time()
+    try:
+        nbin, N = _Rx.shape[:2]
+        pans = separate.pan_vector(options.j, [options.pan1, options.pan2, options.pan3, options.pan4,
+                                               options.pan5, options.pan6, options.pan7, options.pan8])
+        build = partial(separate.build_sources, options.j, options.v, options.g, options.p,
+                        options.t, options.s, options.d, pans, dtype=options.dtype)
+        np.random.seed(seed)
+        sources = build(N, nbin)
+        if options.init is not None:
+            separate.warm_start(sources, options.init, options.init_sources, verbose=False)
+
+        tol = options.tol or None
+        if options.levels:
+            schedule = engine.multiresolution_schedule(options.epoch, options.levels)
+            loglik = engine.estimate_multiresolution(sources, build, _Rx, schedule, tol=tol,
+                                                     threads=options.threads)[1]
+        else:
+            loglik = engine.estimate_source_parameters(sources, _Rx, options.epoch, tol=tol,
+                                                       threads=options.threads)[1]
+        row.update(status='ok', loglik=float(loglik[-1]), iterations=len(loglik))
+    except Exception:
+        row.update(status='failed', error=traceback.format_exc())
+    row['wall_time'] = time.time() - start
+    return row
+
+def aggregate(runs):
+    """
+    Row of a point from its runs (run_point) on the shared seeds: mean and
+    standard deviation of the final log-likelihood, mean number of
+    iterations, total wall time, and seed of the best run (used by -best).
+    """
+    row = {'runs': runs, 'wall_time': sum(run['wall_time'] for run in runs)}
+    failed = [run for run in runs if run['status'] != 'ok']
+    if failed:
+        row.update(status='failed', seed=failed[0]['seed'], error=failed[0]['error'])
+        return row
+    loglik = [run['loglik'] for run in runs]
+    row.update(status='ok', loglik=float(np.mean(loglik)), loglik_std=float(np.std(loglik)),
+               iterations=float(np.mean([run['iterations'] for run in runs])),
+               seed=runs[int(np.argmax(loglik))]['seed'])
+    return row
+
+def rank(rows):
+    """ Sort the rows by decreasing final log-likelihood, failed points last. """
+    return sorted(rows, key=lambda row: (row['status'] != 'ok', -row.get('loglik', 0)))
+
+def write_table(fname, rows, keys):
+    """ Write the ranked rows as a .csv table, one column per swept option. """
+    columns = ['rank'] + keys + ['loglik', 'loglik_std', 'iterations', 'wall_time', 'status']
+    with open(fname, 'w', newline='') as f:
+        writer = csv.DictWriter(f, columns, extrasaction='ignore')
+        writer.writeheader()
+        for i, row in enumerate(rows):
+            writer.writerow(dict(row['options'], rank=i + 1, **row))
+
+def main(spec, output, processes, defaults, best=False):
+    """
+    Run a parameter sweep on one mixture.
+    Args:
+        - spec (dict): search spec, see the header of this file.
+        - output (str): directory of the cache, of sweep.json and sweep.csv.
+        - processes (int): number of EM runs at the same time.
+        - defaults (argparse.Namespace): separate.py options shared by all
+          points, filename being the mixture.
+        - best (bool): separate the mixture with the best point, in <output>/best/.
+    Returns:
+        - rows (list of dict): points ranked by final log-likelihood.
+    """
+    points = list_points(spec, defaults)
+    keys = sorted(set(key for point in points for key in point))
+    seeds = [spec.get('seed', 0) + k for k in range(spec.get('seeds', 1))]
+    os.makedirs(output, exist_ok=True)
+
+    print('> Mixture statistics')
+    cache_dir = defaults.cache_dir or os.path.join(output, 'cache/')
+    key = engine.statistics_key(defaults.filename, separate.wlen, separate.transformType, defaults.dtype)
+    engine.mixture_statistics(defaults.filename, separate.wlen, cache_dir, separate.transformType, defaults.dtype)
+
+    print('> %d points, %d seeds, %d processes' % (len(points), len(seeds), processes))
+    start = time.time()
+    runs = [[] for _ in points]
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker,
+                             initargs=(os.path.join(cache_dir, key),)) as pool:
+        futures = {}
+        for i, point in enumerate(points):
+            options = argparse.Namespace(**vars(defaults))
+            for name, value in point.items():
+                setattr(options, name, value)
+            for seed in seeds:
+                futures[pool.submit(run_point, options, seed)] = i
+
+        for future in as_completed(futures):
+            i = futures[future]
+            run = future.result()
+            runs[i].append(run)
+            print('>> %d %s, seed %d: %s in %.1f s' % (i, points[i], run['seed'], run['status'], run['wall_time']))
+
+    rows = rank([dict(index=i, options=point, **aggregate(sorted(runs[i], key=lambda run: run['seed'])))
+                 for i, point in enumerate(points)])
+    with open(os.path.join(output, 'sweep.json'), 'w') as f:
+        json.dump({'filename': os.path.abspath(defaults.filename), 'spec': spec, 'seeds': seeds,
+                   'statistics': key, 'processes': processes,
+                   'wall_time': time.time() - start, 'points': rows}, f, indent=2)
+    write_table(os.path.join(output, 'sweep.csv'), rows, keys)
+
+    for i, row in enumerate(rows[:10]):
+        print('%3d  %-12s %s' % (i + 1, '%.6g' % row['loglik'] if 'loglik' in row else row['status'],
+                                 row['options']))
+
+    if best and rows and rows[0]['status'] == 'ok':
+        print('> Separation with the best point')
+        options = argparse.Namespace(**vars(defaults))
+        for name, value in rows[0]['options'].items():
+            setattr(options, name, value)
+        options.backend, options.cache_dir, options.cache = 'numpy', cache_dir, True
+        np.random.seed(rows[0]['seed'])
+        separate.run(options, tmp_dir=os.path.join(output, 'best', 'temp/'),
+                     results_dir=os.path.join(output, 'best', 'results/'))
+    return rows
+
+#%% main call
+def cli():
+    """ Command line entry point: python sweep.py, or python -m pam4.sweep. """
+    parser = argparse.ArgumentParser(description='Parameter sweep of the informed audio source separation.')
+
+    parser.add_argument('spec',
+                        type=str, help='Search spec .json file.')
+
+    parser.add_argument('filename',
+                        type=str, help='Mixtures wave file.')
+
+    parser.add_argument('-o', '--output', default='sweep',
+                        type=str, help='Directory of the cache and of the results table.', dest='output')
+
+    parser.add_argument('-P', '--processes', default=os.cpu_count(),
+                        type=int, help='Number of EM runs at the same time.', dest='processes')
+
+    parser.add_argument('-best', action='store_true',
+                        help='Separate the mixture with the best point.', dest='best')
+
+    separate.add_arguments(parser)
+
+    options = parser.parse_args()
+    with open(options.spec) as f:
+        spec = json.load(f)
+    options.filename = os.path.abspath(options.filename)
+    output, processes, best = options.output, options.processes, options.best
+    for key in ['spec', 'output', 'processes', 'best']:
+        delattr(options, key)
+
+    rows = main(spec, output, processes, options, best)
+    sys.exit(not rows or rows[0]['status'] != 'ok')
+
+if __name__ == "__main__":
+    cli()
@@ -1,6 +1,27 @@
 import numpy as np
 #import XMLReader
-import patterns
+from . import patterns
+
+def pan_law(pan):
+    """ Constant-power stereo gains (2, 1) of a source. pan: -1 for left and +1 for right. """
+    return np.array(([np.sin((1+pan) * np.pi/4)],
+                     [np.cos((1+pan) * np.pi/4)]))
+
+def astype(source, dtype=np.float32):
+    """
+    Cast the matrices of a source (A, excitation and filter parameters) to
+    dtype, in place. The templates draw their random initializations in
+    float64, so that a seed gives the same sources in both precisions.
+    Args:
+        - source (dict): source built by a template.
+        - dtype (dtype): np.float32 or np.float64.
+    Returns:
+        - source (dict): the same source.
+    """
+    for key, param in source.items():
+        if isinstance(param, dict) and 'data' in param:
+            param['data'] = param['data'].astype(dtype, copy=False)
+    return source
 
 def voice(j, N, nbin, pan=0):
     """
@@ -25,8 +46,7 @@ def voice(j, N, nbin, pan=0):
     source['A'] = {}
     source['A']['mixingType'] = 'inst'    # Instantaneous mixture
     source['A']['adaptability'] = 'free'  # Will be adapted by FASST
-    source['A']['data'] = np.array(([np.sin((1+pan) * np.pi/4)],
-                                    [np.cos((1+pan) * np.pi/4)]))
+    source['A']['data'] = pan_law(pan)
 
     # Spectral patterns (Wex) and time activation patterns applied to spectral patterns (Hex)
     source['Wex'] = {}
@@ -39,7 +59,7 @@ def voice(j, N, nbin, pan=0):
 
     source['Gex'] = {}
     source['Gex']['adaptability'] = 'fixed'
-    source['Gex']['data'] = np.eye((K, M)) # GSMM model for monophonic
+    source['Gex']['data'] = np.eye(K, M) # GSMM model for monophonic
 
     source['Hex'] = {}
     source['Hex']['data'] = 0.75 * abs(np.random.randn(M, N)) + 0.25 * np.ones((M, N))
@@ -56,7 +76,7 @@ def voice(j, N, nbin, pan=0):
     return source
 
 
-def guitar(j, N, nbin, pan=0):
+def guitar(j, N, nbin, pan=0, decay=0.01):
     """
     Guitar model template.
     Args:
@@ -64,6 +84,7 @@ def guitar(j, N, nbin, pan=0):
         - N (int): number of frames.
         - nbin (int): number of frequency bins.
         - pan (float): stereo pan. -1 for left and +1 for right.
+        - decay (float): exponential decay of the notes per frame.
     """
     source = {}
     L = 6 * 60
@@ -78,13 +99,12 @@ def guitar(j, N, nbin, pan=0):
     source['A'] = {}
     source['A']['mixingType'] = 'inst'    # Instantaneous mixture
     source['A']['adaptability'] = 'free'  # Will be adapted by FASST
-    source['A']['data'] = np.array(([np.sin((1+pan) * np.pi/4)],
-                                    [np.cos((1+pan) * np.pi/4)]))
+    source['A']['data'] = pan_law(pan)
 
     # Spectral patterns (Wex) and time activation patterns applied to spectral patterns (Hex)
     source['Wex'] = {}
     source['Wex']['adaptability'] = 'free' # Will be adapted by FASST
-    source['Wex']['data'] = 0.75 * abs(np.random.randn(nbin, K)) + 0.25 * np.ones((nbin, K))
+    source['Wex']['data'] = 0.75 * abs(np.random.randn(nbin, L)) + 0.25 * np.ones((nbin, L))
     source['Uex'] = {}
     source['Uex']['adaptability'] = 'free' # Will be adapted by FASST
     source['Uex']['data'] = 0.75 * abs(np.random.randn(L, K)) + 0.25 * np.ones((L, K))
@@ -92,7 +112,7 @@ def guitar(j, N, nbin, pan=0):
     source['Gex']['adaptability'] = 'free' # Will be adapted by FASST
     source['Gex']['data'] = 0.75 * abs(np.random.randn(K, M)) + 0.25 * np.ones((K, M))
     source['Hex'] = {}
-    source['Hex']['data'] = patterns.H_attack_decay(M, N)
+    source['Hex']['data'] = patterns.H_attack_decay_op(M, N, decay)
     source['Hex']['adaptability'] = 'fixed' # Will be adapted by FASST
 
 
@@ -106,7 +126,7 @@ def guitar(j, N, nbin, pan=0):
 
     return source
 
-def piano(j, N, nbin, pan=0):
+def piano(j, N, nbin, pan=0, decay=0.01):
     """
     Piano model template.
     Args:
@@ -114,6 +134,7 @@ def piano(j, N, nbin, pan=0):
         - N (int): number of frames.
         - nbin (int): number of frequency bins.
         - pan (float): stereo pan. -1 for left and +1 for right.
+        - decay (float): exponential decay of the notes per frame.
     """
 
     source = {}
@@ -129,8 +150,7 @@ def piano(j, N, nbin, pan=0):
     source['A'] = {}
     source['A']['mixingType'] = 'inst'    # Instantaneous mixture
     source['A']['adaptability'] = 'free'  # Will be adapted by FASST
-    source['A']['data'] = np.array(([np.sin((1+pan) * np.pi/4)],
-                                    [np.cos((1+pan) * np.pi/4)]))
+    source['A']['data'] = pan_law(pan)
 
     # Spectral patterns (Wex) and time activation patterns applied to spectral patterns (Hex)
     source['Wex'] = {}
@@ -147,7 +167,7 @@ def piano(j, N, nbin, pan=0):
 
     source['Hex'] = {}
     source['Hex']['adaptability'] = 'fixed' # Will be adapted by FASST
-    source['Hex']['data'] = patterns.H_attack_decay(M, N)
+    source['Hex']['data'] = patterns.H_attack_decay_op(M, N, decay)
 
     ## Wiener filter parameters
     source['wiener'] = {}
@@ -182,8 +202,7 @@ def trumpet(j, N, nbin, pan=0):
     source['A'] = {}
     source['A']['mixingType'] = 'inst'    # Instantaneous mixture
     source['A']['adaptability'] = 'free'  # Will be adapted by FASST
-    source['A']['data'] = np.array(([np.sin((1+pan) * np.pi/4)],
-                                    [np.cos((1+pan) * np.pi/4)]))
+    source['A']['data'] = pan_law(pan)
 
     # Spectral patterns (Wex) and time activation patterns applied to spectral patterns (Hex)
     source['Wex'] = {}
@@ -196,7 +215,7 @@ def trumpet(j, N, nbin, pan=0):
 
     source['Gex'] = {}
     source['Gex']['adaptability'] = 'fixed'
-    source['Gex']['data'] = np.eye((K, M)) # GSMM model for monophonic
+    source['Gex']['data'] = np.eye(K, M) # GSMM model for monophonic
 
     source['Hex'] = {}
     source['Hex']['data'] = 0.75 * abs(np.random.randn(M, N)) + 0.25 * np.ones((M, N))
@@ -235,8 +254,7 @@ def saxophone(j, N, nbin, pan=0):
     source['A'] = {}
     source['A']['mixingType'] = 'inst'    # Instantaneous mixture
     source['A']['adaptability'] = 'free'  # Will be adapted by FASST
-    source['A']['data'] = np.array(([np.sin((1+pan) * np.pi/4)],
-                                    [np.cos((1+pan) * np.pi/4)]))
+    source['A']['data'] = pan_law(pan)
 
     # Spectral patterns (Wex) and time activation patterns applied to spectral patterns (Hex)
     source['Wex'] = {}
@@ -249,7 +267,7 @@ def saxophone(j, N, nbin, pan=0):
 
     source['Gex'] = {}
     source['Gex']['adaptability'] = 'fixed'
-    source['Gex']['data'] = np.eye((K, M)) # GSMM model for monophonic
+    source['Gex']['data'] = np.eye(K, M) # GSMM model for monophonic
 
     source['Hex'] = {}
     source['Hex']['data'] = 0.75 * abs(np.random.randn(M, N)) + 0.25 * np.ones((M, N))
@@ -287,8 +305,7 @@ def drums(j, N, nbin, pan=0):
     source['A'] = {}
     source['A']['mixingType'] = 'inst'    # Instantaneous mixture
     source['A']['adaptability'] = 'free'  # Will be adapted by FASST
-    source['A']['data'] = np.array(([np.sin((1+pan) * np.pi/4)],
-                                    [np.cos((1+pan) * np.pi/4)]))
+    source['A']['data'] = pan_law(pan)
 
     # Spectral patterns (Wex) and time activation patterns applied to spectral patterns (Hex)
     source['Wex'] = {}
@@ -332,8 +349,7 @@ def other(j, N, nbin, pan=0):
     source['A'] = {}
     source['A']['mixingType'] = 'inst'    # Instantaneous mixture
     source['A']['adaptability'] = 'free'  # Will be adapted by FASST
-    source['A']['data'] = np.array(([np.sin((1+pan) * np.pi/4)],
-                                    [np.cos((1+pan) * np.pi/4)]))
+    source['A']['data'] = pan_law(pan)
 
     # Spectral patterns (Wex) and time activation patterns applied to spectral patterns (Hex)
     source['Wex'] = {}
@@ -0,0 +1,175 @@
+import queue
+import threading
+import numpy as np
+import torch
+import torch.nn as nn
+
+from . import audio
+
+def load(filename):
+    """ Load a .wav file into a (n, T) float32 tensor. """
+    x, sample_rate = audio.read(filename, dtype=np.float32)
+    return torch.from_numpy(np.ascontiguousarray(x.T)), sample_rate
+
+def save(filename, audio_tensor, sample_rate):
+    """ Save a (n, T) tensor as a 16 bits .wav file. """
+    audio.write(filename, audio_tensor.detach().cpu().numpy().T, sample_rate)
+    return None
+
+def info(filename):
+    """ Number of channels, sample rate and number of samples of a .wav file. """
+    wav = audio.WavFile(filename)
+    return wav.nb_channels, wav.sample_rate, wav.nb_samples
+
+def stream(filename, block_size):
+    """ Read a .wav file block by block, in constant memory.
+    Args:
+        - filename (str): path to the .wav file.
+        - block_size (int): number of samples per block.
+    Yields:
+        - block (n, block_size): tensor in [-1, 1], the last one may be shorter.
+    """
+    for block in audio.WavFile(filename).chunks(block_size):
+        yield torch.from_numpy(np.ascontiguousarray(block.T))
+
+def windows(filename, window, batch_size, seed=None):
+    """ Endless mini-batches of shuffled windows of a .wav file.
+    Windows are read with random access in the memory-mapped file, so
+    memory does not depend on its length. Each pass over the file uses a
+    new permutation.
+    Args:
+        - filename (str): path to the .wav file.
+        - window (int): number of samples per window.
+        - batch_size (int): number of windows per mini-batch.
+        - seed (int): seed of the shuffling.
+    Yields:
+        - batch (batch_size, n, window): tensor in [-1, 1].
+    """
+    rng = np.random.default_rng(seed)
+    wav = audio.WavFile(filename)
+    nb_windows = wav.nb_samples // window
+    if nb_windows < batch_size:
+        raise ValueError('%s has %d windows of %d samples, less than a batch of %d'
+                         % (filename, nb_windows, window, batch_size))
+    while True:
+        order = rng.permutation(nb_windows)
+        for i in range(0, nb_windows - batch_size + 1, batch_size):
+            batch = np.empty((batch_size, wav.nb_channels, window), dtype=np.float32)
+            for b, w in enumerate(order[i:i + batch_size]):
+                batch[b] = wav.read(w * window, (w + 1) * window).T
+            yield torch.from_numpy(batch)
+
+def prefetch(iterable, depth=2):
+    """ Iterate over iterable, the next items being produced by a background
+    thread while the current one is used.
+    Args:
+        - iterable: items to prefetch.
+        - depth (int): maximum number of items produced in advance.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        """ Queue item unless the consumer has stopped, returns whether it was queued. """
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(end)
+        except Exception as e:
+            put(e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is end:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def kurto(y):
+    """ Compute kurtosis of signal.
+    Excess (Fisher) kurtosis of each row of y, as scipy.stats.kurtosis, but
+    computed in torch: it stays on the device of y and is differentiable.
+    Args:
+        - y (..., n, T): signals, with optional leading batch dimensions.
+    Returns:
+        - k (..., n): kurtosis of each signal.
+    """
+    y = y - y.mean(dim=-1, keepdim=True)
+    m2 = (y ** 2).mean(dim=-1)
+    m4 = (y ** 4).mean(dim=-1)
+    return m4 / m2 ** 2 - 3
+
+def edgeworth(s, k):
+    """ Edgeworth approximation of the score function, k broadcast against s. """
+    phi = s - k * (s**3 - 3 * s) / 6.0
+    return phi
+
+class H(nn.Module):
+    """ Estimation function.
+    Attributes:
+        - phi : non-linear function.
+        - n (int): number of sources.
+    """
+    def __init__(self, phi, n):
+        super(H, self).__init__()
+        self.phi = phi
+        self.n = n
+    
+    def forward(self, y, k):
+        """
+        Mean of the estimation function over a block of samples, computed as
+        a single (batched) matrix product.
+        Args:
+            - y (..., n, T): block of estimated sources, or (n,) at time t.
+            - k (..., n): vector of associated kurtosis.
+        Returns:
+            - H (..., n, n)
+        """
+        if y.dim() == 1:
+            y = y.unsqueeze(-1)
+        T = y.size(-1)
+        phi = self.phi(y, k.unsqueeze(-1))
+        H = phi @ y.transpose(-1, -2) / T - torch.eye(self.n, dtype=y.dtype, device=y.device)
+        return H
+
+class estimation_equation(nn.Module):
+    """ Custom loss.
+    Args:
+        - n: number of sources/mixtures
+        - estim_f : estimation function
+    """
+    def __init__(self, n, estim_f):
+        super(estimation_equation, self).__init__()
+        self.n = n
+        self.H = estim_f
+        
+    def forward(self, y):
+        """
+        Args:
+            - y (n, T) or (B, n, T): estimated sources, or mini-batch of
+              blocks of estimated sources.
+        Returns:
+            - loss: sum of the mean estimation function, averaged over the
+              mini-batch.
+        """
+        k = kurto(y)
+        H_hat = self.H(y, k)
+        
+        return torch.sum(H_hat, dim=(-2, -1)).mean()
\ No newline at end of file
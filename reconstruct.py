@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+# Command line entry point of pam4/reconstruct.py (same as python -m pam4.reconstruct).
+from pam4.reconstruct import cli
+
+if __name__ == "__main__":
+    cli()
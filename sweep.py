@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+# Command line entry point of pam4/sweep.py (same as python -m pam4.sweep).
+from pam4.sweep import cli
+
+if __name__ == "__main__":
+    cli()
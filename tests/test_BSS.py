@@ -0,0 +1,39 @@
+import numpy as np
+
+from pam4 import BSS
+
+
+def test_whiten_chunked_matches_whiten():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((1000, 2)) @ np.array([[1., .5], [.3, 2.]]) + 3
+    original = X.copy()
+
+    Y = BSS.whiten_chunked(X, chunk_size=100)
+
+    np.testing.assert_array_equal(X, original)
+    np.testing.assert_allclose(Y, BSS.whiten(X), atol=1e-10)
+
+
+def amari_index(P):
+    P = np.abs(P)
+    n = len(P)
+    rows = (P.sum(axis=1) / P.max(axis=1) - 1).sum()
+    cols = (P.sum(axis=0) / P.max(axis=0) - 1).sum()
+    return (rows + cols) / (2 * n * (n - 1))
+
+
+def test_relative_gradient_descend_separates():
+    rng = np.random.default_rng(0)
+    s = np.column_stack([rng.laplace(size=20000), rng.uniform(-1, 1, 20000),
+                         np.sin(rng.uniform(0, 2 * np.pi, 20000))])
+    s = (s - s.mean(axis=0)) / s.std(axis=0)
+    x = s @ rng.uniform(.2, 1, (3, 3)).T
+
+    y, B, loss = BSS.relative_gradient_descend(x)
+
+    def mixing(y):
+        return np.corrcoef(y.T, s.T)[:3, 3:]
+
+    assert min(loss) < .01 * loss[0]
+    assert amari_index(mixing(y)) < .1 * amari_index(mixing(BSS.whiten(x)))
+    np.testing.assert_allclose(y.std(axis=0), 1, rtol=1e-6)
@@ -0,0 +1,25 @@
+import wave
+
+import numpy as np
+
+from pam4 import audio
+
+
+def test_read_24_bits(tmp_path):
+    x = np.array([[0, 1], [-1, 2**23 - 1], [-2**23, 12345], [-12345, 2**22]])
+    data = np.stack([x & 0xFF, x >> 8 & 0xFF, x >> 16 & 0xFF], axis=-1).astype(np.uint8)
+    filename = str(tmp_path / 'pcm24.wav')
+    with wave.open(filename, 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(3)
+        f.setframerate(16000)
+        f.writeframes(data.tobytes())
+
+    wav = audio.WavFile(filename)
+    assert (wav.nb_channels, wav.nb_samples) == (2, 4)
+    np.testing.assert_array_equal(wav.read(dtype=np.float64), x / 2**23)
+    np.testing.assert_array_equal(wav.read(1, 3), (x[1:3] / 2**23).astype(np.float32))
+
+    y, sr_hz = audio.read(filename)
+    assert sr_hz == 16000
+    np.testing.assert_allclose(y, x / 2**23, atol=1e-7)
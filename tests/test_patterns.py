@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from pam4 import engine
+from pam4 import patterns
+
+shapes = [(8, 4), (6, 6), (10, 3)]
+
+
+@pytest.mark.parametrize('M, N', shapes)
+def test_toeplitz_matches_dense(M, N):
+    dense = patterns.H_attack_decay(M, N, decay=0.3)
+    T = patterns.H_attack_decay_op(M, N, decay=0.3)
+
+    np.testing.assert_array_equal(T.toarray(), dense)
+    np.testing.assert_array_equal(T.T.toarray(), dense.T)
+    np.testing.assert_array_equal(T.columns(1, N - 1), dense[:, 1:N - 1])
+
+
+@pytest.mark.parametrize('M, N', shapes)
+def test_toeplitz_products(M, N):
+    rng = np.random.default_rng(0)
+    dense = patterns.H_attack_decay(M, N, decay=0.3)
+    T = patterns.H_attack_decay_op(M, N, decay=0.3)
+    Z, z = rng.random((N, 5)), rng.random(N)
+    W, w = rng.random((5, M)), rng.random(M)
+
+    np.testing.assert_allclose(T @ Z, dense @ Z, atol=1e-12)
+    np.testing.assert_allclose(T @ z, dense @ z, atol=1e-12)
+    np.testing.assert_allclose(W @ T, W @ dense, atol=1e-12)
+    np.testing.assert_allclose(w @ T, w @ dense, atol=1e-12)
+    np.testing.assert_allclose(T.T @ W.T, dense.T @ W.T, atol=1e-12)
+
+
+def test_toeplitz_support_masks():
+    # Rows of H_attack_decay below its Dirac pattern are structurally zero
+    M, N = 10, 3
+    dense = patterns.H_attack_decay(M, N, decay=0.3)
+    T = patterns.H_attack_decay_op(M, N, decay=0.3)
+    empty = ~dense.any(axis=1)
+    assert empty.any()
+
+    Z = np.random.default_rng(1).random((N, 4))
+    assert np.all((T @ Z)[empty] == 0)
+    assert np.all((Z.T @ T.T)[:, empty] == 0)
+
+
+def test_toeplitz_astype():
+    T = patterns.H_attack_decay_op(8, 4, decay=0.3)
+    single = T.astype(np.float32)
+
+    assert single.dtype == np.float32
+    np.testing.assert_array_equal(single.toarray(), T.toarray().astype(np.float32))
+    assert T.astype(np.float64, copy=False) is T
+    assert T.astype(np.float64) is not T
+
+
+def make_source(Hex, rng, nbin=6, L=3, K=4):
+    M = Hex.shape[0]
+    data = {'Wex': rng.random((nbin, L)) + .25, 'Uex': rng.random((L, K)) + .25,
+            'Gex': rng.random((K, M)) + .25}
+    source = {p: {'data': value, 'adaptability': 'free'} for p, value in data.items()}
+    source['Hex'] = {'data': Hex, 'adaptability': 'fixed'}
+    return source
+
+
+def test_update_spectral_parameters_toeplitz():
+    M, N = 10, 3
+    dense = patterns.H_attack_decay(M, N, decay=0.3)
+    T = patterns.H_attack_decay_op(M, N, decay=0.3)
+    source = make_source(T, np.random.default_rng(2))
+    reference = make_source(dense, np.random.default_rng(2))
+    xi = np.random.default_rng(3).random((6, N)) + .1
+    Gex = source['Gex']['data'].copy()
+
+    for it in range(5):
+        engine.update_spectral_parameters(source, xi)
+        engine.update_spectral_parameters(reference, xi)
+
+    for p in ['Wex', 'Uex', 'Gex']:
+        np.testing.assert_allclose(source[p]['data'], reference[p]['data'], rtol=1e-9)
+    # Gex columns facing the empty rows of Hex do not contribute to V: unchanged
+    empty = ~dense.any(axis=1)
+    np.testing.assert_array_equal(source['Gex']['data'][:, empty], Gex[:, empty])
+    assert np.all(engine.source_power(source) >= 0)